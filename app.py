@@ -1,108 +1,218 @@
-from flask import Flask, request, render_template_string
-from industry6 import SmartOutfitRecommender, register_user, authenticate_user, set_user_preferences
-
-app = Flask(__name__, static_url_path='/wardrobe', static_folder='wardrobe')
-
-WARDROBE_PATH = "wardrobe.json"
-recommender = SmartOutfitRecommender(WARDROBE_PATH)
-
-# Updated minimal HTML template
-html_form = """
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Smart Outfit Recommender</title>
-    <style>
-        body { font-family: Arial; margin: 30px; background: #f0f0f0; }
-        input, select { width: 300px; padding: 8px; margin-top: 5px; }
-        label { display: block; margin-top: 15px; font-weight: bold; }
-        button { padding: 10px 20px; margin-top: 20px; font-weight: bold; }
-        .result-box { margin-top: 30px; padding: 20px; background: white; border-radius: 10px; border: 1px solid #ccc; }
-        .outfit { margin-top: 20px; padding: 10px; background: #f9f9f9; border: 1px solid #aaa; border-radius: 8px; }
-        img { height: 100px; border-radius: 6px; margin-right: 10px; margin-top: 5px; }
-    </style>
-</head>
-<body>
-    <h1>Smart Outfit Recommender</h1>
-    <form method="post" action="/get_recommendation">
-        <label>Username:<br><input type="text" name="username" required></label>
-        <label>Password:<br><input type="password" name="password" required></label>
-        <label>Gender:<br>
-            <select name="gender" required>
-                <option value="female">Female</option>
-                <option value="male">Male</option>
-                <option value="unisex">Unisex</option>
-            </select>
-        </label>
-        <label>Age Group:<br>
-            <select name="age_group" required>
-                <option value="toddler">Toddler</option>
-                <option value="teen">Teen</option>
-                <option value="adult" selected>Adult</option>
-                <option value="senior">Senior</option>
-            </select>
-        </label>
-        <label>Prompt:<br><input type="text" name="prompt" required></label>
-        <button type="submit">Get Recommendations</button>
-    </form>
-
-    {% if result %}
-    <div class="result-box">
-        <h2>Your Prompt</h2>
-        <p><strong>{{ result['original_prompt'] }}</strong></p>
-
-        <h2>Recommended Outfits</h2>
-        {% for outfit in result['outfits'] %}
-        <div class="outfit">
-            <p><strong>Type:</strong> {{ outfit['type'] }}</p>
-            <ul style="list-style: none;">
-                {% for item in outfit['items'] %}
-                <li>
-                    <strong>{{ item['name'] }}</strong> – <em>{{ item['category'] }}</em><br>
-                    <img src="/wardrobe/{{ item['image'].split('/')[-1] }}" alt="{{ item['name'] }}">
-                </li>
-                {% endfor %}
-            </ul>
-        </div>
-        {% endfor %}
-    </div>
-    {% endif %}
-</body>
-</html>
-"""
-
-@app.route('/', methods=['GET'])
-def home():
-    return render_template_string(html_form)
-
-@app.route('/get_recommendation', methods=['POST'])
-def get_recommendation():
-    username = request.form.get("username")
-    password = request.form.get("password")
-    gender = request.form.get("gender")
-    age_group = request.form.get("age_group")
-    prompt = request.form.get("prompt")
-
-    try:
-        register_user(username, password, {
-            "age_group": age_group,
-            "gender": gender
-        })
-    except ValueError:
-        set_user_preferences(username, {
-            "age_group": age_group,
-            "gender": gender
-        })
-
-    if not authenticate_user(username, password):
-        return render_template_string(html_form + "<p style='color:red;'>Invalid credentials</p>")
-
-    try:
-        result = recommender.recommend_outfits(prompt, username)
-        result['original_prompt'] = prompt  # Show exactly what user typed
-        return render_template_string(html_form, result=result)
-    except Exception as e:
-        return f"<p>Error: {str(e)}</p>", 500
-
-if __name__ == '__main__':
-    app.run(debug=True)
+import os
+
+from flask import Flask, abort, jsonify, request
+from industry6 import SmartOutfitRecommender, register_user, authenticate_user, set_user_preferences, user_exists
+
+app = Flask(__name__, static_url_path='/wardrobe', static_folder='wardrobe')
+
+# Wardrobe images are immutable; let browsers cache them for a week. In
+# production nginx serves /wardrobe/ directly (see deploy/nginx.conf) and
+# Flask's static handler is only hit in dev.
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 604800
+
+# A recommendation POST is a handful of short form fields; cap the body so
+# one pathological request cannot monopolize a worker.
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024
+
+_GENDERS = frozenset({"female", "male", "unisex"})
+
+WARDROBE_PATH = "wardrobe.json"
+recommender = SmartOutfitRecommender(WARDROBE_PATH)
+
+# Recommendations keyed by (prompt, profile) so identical prompts from users
+# with the same profile skip the whole pipeline. Flushed whenever the
+# wardrobe file is reloaded (its mtime changes).
+_RECOMMEND_CACHE = {}
+_RECOMMEND_CACHE_MAX = 1024
+_recommend_cache_mtime = recommender._mtime
+
+def _public_outfits(outfits):
+    # Wardrobe item dicts carry internal annotations (frozensets, bitmasks,
+    # absolute server paths) that are neither JSON serializable nor meant
+    # for browsers; expose only the fields the page renders.
+    return [
+        {
+            "type": outfit["type"],
+            "items": [
+                {
+                    "name": item["name"],
+                    "category": item["category"],
+                    "image_basename": item.get("image", "").rsplit('/', 1)[-1],
+                }
+                for item in outfit["items"]
+            ],
+        }
+        for outfit in outfits
+    ]
+
+def _recommend(prompt, username, gender, age_group):
+    global _recommend_cache_mtime
+    # _mtime only moves when the recommender itself reloads, which used to
+    # happen on cache misses alone — hot keys would then serve stale
+    # results forever. Stat the wardrobe file before consulting the cache.
+    recommender._maybe_reload()
+    if recommender._mtime != _recommend_cache_mtime:
+        _RECOMMEND_CACHE.clear()
+        _recommend_cache_mtime = recommender._mtime
+    key = (prompt, gender, age_group)
+    result = _RECOMMEND_CACHE.get(key)
+    if result is None:
+        raw = recommender.recommend_outfits(prompt, username)
+        result = {
+            "occasion": raw["occasion"],
+            "context": raw["context"],
+            "outfits": _public_outfits(raw["outfits"]),
+        }
+        if len(_RECOMMEND_CACHE) >= _RECOMMEND_CACHE_MAX:
+            _RECOMMEND_CACHE.pop(next(iter(_RECOMMEND_CACHE)))
+        _RECOMMEND_CACHE[key] = result
+    # Shared across users with the same profile; fix up the user field.
+    result = dict(result)
+    result['user'] = username
+    return result
+
+# Static page shell: the form chrome never changes, so it is served as-is
+# and the outfit list is rendered client-side from the JSON response.
+HTML_SHELL = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Smart Outfit Recommender</title>
+    <style>
+        body { font-family: Arial; margin: 30px; background: #f0f0f0; }
+        input, select { width: 300px; padding: 8px; margin-top: 5px; }
+        label { display: block; margin-top: 15px; font-weight: bold; }
+        button { padding: 10px 20px; margin-top: 20px; font-weight: bold; }
+        .result-box { margin-top: 30px; padding: 20px; background: white; border-radius: 10px; border: 1px solid #ccc; }
+        .outfit { margin-top: 20px; padding: 10px; background: #f9f9f9; border: 1px solid #aaa; border-radius: 8px; }
+        img { height: 100px; border-radius: 6px; margin-right: 10px; margin-top: 5px; }
+        .error { color: red; }
+    </style>
+</head>
+<body>
+    <h1>Smart Outfit Recommender</h1>
+    <form id="rec-form" method="post" action="/get_recommendation">
+        <label>Username:<br><input type="text" name="username" required></label>
+        <label>Password:<br><input type="password" name="password" required></label>
+        <label>Gender:<br>
+            <select name="gender" required>
+                <option value="female">Female</option>
+                <option value="male">Male</option>
+                <option value="unisex">Unisex</option>
+            </select>
+        </label>
+        <label>Age Group:<br>
+            <select name="age_group" required>
+                <option value="toddler">Toddler</option>
+                <option value="teen">Teen</option>
+                <option value="adult" selected>Adult</option>
+                <option value="senior">Senior</option>
+            </select>
+        </label>
+        <label>Prompt:<br><input type="text" name="prompt" required></label>
+        <button type="submit">Get Recommendations</button>
+    </form>
+
+    <div id="result"></div>
+
+    <script>
+    document.getElementById('rec-form').addEventListener('submit', async function (e) {
+        e.preventDefault();
+        var box = document.getElementById('result');
+        box.textContent = '';
+        var resp = await fetch('/get_recommendation', {method: 'POST', body: new FormData(e.target)});
+        var data = await resp.json().catch(function () { return {}; });
+        if (!resp.ok) {
+            var err = document.createElement('p');
+            err.className = 'error';
+            err.textContent = data.error || 'Request failed';
+            box.appendChild(err);
+            return;
+        }
+        var div = document.createElement('div');
+        div.className = 'result-box';
+        div.innerHTML = '<h2>Your Prompt</h2><p><strong></strong></p><h2>Recommended Outfits</h2>';
+        div.querySelector('strong').textContent = data.original_prompt;
+        data.outfits.forEach(function (outfit) {
+            var od = document.createElement('div');
+            od.className = 'outfit';
+            var type = document.createElement('p');
+            type.innerHTML = '<strong>Type:</strong> ';
+            type.appendChild(document.createTextNode(outfit.type));
+            od.appendChild(type);
+            var ul = document.createElement('ul');
+            ul.style.listStyle = 'none';
+            outfit.items.forEach(function (item) {
+                var li = document.createElement('li');
+                var name = document.createElement('strong');
+                name.textContent = item.name;
+                li.appendChild(name);
+                li.appendChild(document.createTextNode(' \\u2013 '));
+                var cat = document.createElement('em');
+                cat.textContent = item.category;
+                li.appendChild(cat);
+                li.appendChild(document.createElement('br'));
+                var img = document.createElement('img');
+                img.src = '/wardrobe/' + item.image_basename;
+                img.alt = item.name;
+                li.appendChild(img);
+                ul.appendChild(li);
+            });
+            od.appendChild(ul);
+            div.appendChild(od);
+        });
+        box.appendChild(div);
+    });
+    </script>
+</body>
+</html>
+"""
+
+@app.route('/', methods=['GET'])
+def home():
+    return HTML_SHELL
+
+@app.route('/get_recommendation', methods=['POST'])
+def get_recommendation():
+    f = request.form
+    username, password, gender, age_group, prompt = (
+        f.get(k) for k in ("username", "password", "gender", "age_group", "prompt")
+    )
+
+    if not all((username, password, gender, age_group, prompt)):
+        abort(400)
+    if gender not in _GENDERS:
+        abort(400)
+    # Bound per-request work before the prompt reaches the recommender.
+    if len(prompt) > 512 or len(username) > 64 or len(password) > 128:
+        abort(413)
+
+    prefs = {"age_group": age_group, "gender": gender}
+
+    # Existing users are the common case; probe first instead of letting
+    # register_user raise on every login.
+    if user_exists(username):
+        # Apply any profile change inline so the recommendation we are
+        # about to compute — and the cache entry keyed by the submitted
+        # profile — reflect it. set_user_preferences is a no-op when the
+        # stored preferences already match, which is the common case.
+        set_user_preferences(username, prefs)
+    else:
+        try:
+            register_user(username, password, prefs)
+        except ValueError:
+            # Raced with a concurrent registration of the same name.
+            set_user_preferences(username, prefs)
+
+    if not authenticate_user(username, password):
+        return jsonify({"error": "Invalid credentials"}), 401
+
+    try:
+        result = _recommend(prompt, username, gender, age_group)
+        result['original_prompt'] = prompt  # Show exactly what user typed
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+if __name__ == '__main__':
+    app.run(debug=os.getenv("FLASK_DEBUG") == "1")
@@ -1,1064 +1,1516 @@
-# vacation and trip handler for SmartOutfitRecommender
-import datetime
-import random
-import re
-import json
-import hashlib
-from typing import List, Dict, Tuple
-from colormath.color_objects import sRGBColor, LabColor
-from colormath.color_conversions import convert_color
-from colormath.color_diff import delta_e_cie2000
-import tempfile
-import webbrowser
-import os
-
-USER_DB = {}
-
-OCCASION_STYLES = {
-    "interview": ["formal"],
-    "business meeting": ["formal"],
-    "office": ["formal", "semi-formal"],
-    "office party": ["semi-formal", "party"],
-    "office ethnic day": ["ethnic"],
-    "college ethnic day": ["ethnic"],
-    "ethnic day": ["ethnic"],
-    "wedding": [ "party"],
-    "ritual": ["ethnic", "traditional"],
-    "home ritual": ["ethnic", "traditional"],
-    "ceremony": ["ethnic", "formal"],
-    "temple visit": ["ethnic", "traditional"],
-    "birthday party": ["party"],
-    "party": ["party"],
-    "casual outing": ["casual", "shopping", "picnic"],
-    "picnic": ["casual", "comfortable", "picnic", "shopping"],
-    "shopping": ["casual", "shopping", "picnic"],
-    "date": ["party", "smart-casual"],
-    "beach party": ["party", "summerwear"],
-    "kids party": ["colorful", "casual"],
-    "kids outing": ["casual", "comfortable"],
-    "family outing": ["casual", "semi-formal"],
-    "family gathering": ["casual", "ethnic", "semi-formal"],
-    "school": ["uniform", "casual"],
-    "school function": ["ethnic", "formal"],
-    "tuition": ["casual"],
-    "cooking": ["comfortable"],
-    "swimming": ["swim", "swimwear", "swiming"],
-    "sports": ["gym", "yoga", "camping", "trekking", "running","hiking"],
-    "gym": ["yoga", "hiking", "camping", "trekking", "running"],
-    "exercise": ["gym", "yoga", "hiking", "camping", "trekking", "running"],
-    
-    "yoga": ["gym", "hiking", "camping", "trekking", "running"],
-    "meditation": ["yoga"],
-    "hiking": ["gym", "yoga", "camping", "trekking", "running"],
-    "camping": ["gym", "yoga", "hiking", "trekking", "running"],
-    "trekking": ["gym", "yoga", "camping", "hiking", "running"],
-    "mountain climbing": ["gym", "yoga", "camping", "trekking", "running","hiking"],
-    "gardening": ["casual","camping"]
-}
-
-OCCASION_SYNONYMS = {
-    "party": ["birthday party", "beach party", "wedding", "date", "office party", "officeparty"],
-    "gym": ["yoga", "hiking", "camping", "trekking", "running", "exercise"],
-    "shopping": ["mall", "buying clothes", "store visit"],
-    "picnic": ["outdoor fun", "park outing"]
-}
-
-
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def register_user(username: str, password: str, preferences: Dict = None):
-    if username in USER_DB:
-        raise ValueError("User already exists")
-    USER_DB[username] = {
-        "password_hash": hash_password(password),
-        "preferences": preferences or {"age_group": "adult", "gender": "unisex"}
-    }
-
-def authenticate_user(username: str, password: str) -> bool:
-    return username in USER_DB and USER_DB[username]["password_hash"] == hash_password(password)
-
-def get_user_preferences(username: str) -> Dict:
-    return USER_DB[username]["preferences"]
-
-def set_user_preferences(username: str, preferences: Dict):
-    if username in USER_DB:
-        USER_DB[username]["preferences"] = preferences
-
-
-class SmartOutfitRecommender:
-    def __init__(self, wardrobe_path: str):
-        with open(wardrobe_path, "r", encoding="utf-8") as f:
-            self.wardrobe_db = json.load(f)
-        for item in self.wardrobe_db:
-            item.setdefault("tags", [])
-            item.setdefault("category", "unknown")
-            item.setdefault("age_group", "all")
-            item.setdefault("gender", "unisex")
-            item.setdefault("image", "")
-
-    def get_context(self):
-        now = datetime.datetime.now()
-        hour = now.hour
-        month = now.month
-        time_of_day = ("morning" if hour < 12 else "afternoon" if hour < 17 else "evening")
-        season = ("winter" if month in [12,1,2] else "summer" if month in [3,4,5] else "monsoon")
-        return {"time": time_of_day, "season": season}
-
-    def extract_prompt_requirements(self, prompt: str) -> Tuple[List[str], List[str], List[str], bool]:
-        prompt = prompt.lower()
-        colors = re.findall(r'\b(?:in|with|wearing|colour|color|shade of)\s+(\w+)', prompt)
-        avoid = re.findall(r'\b(?:avoid|not|no|don\'t want|skip)\s+(\w+)', prompt)
-        # Normalize forbidden colors to unify near-whites
-        avoid = [a.replace("offwhite", "white").replace("off-white", "white").replace("cream", "white").replace("ivory", "white").replace("beige", "white") for a in avoid]
-
-        # Normalize common swim-related misspellings/synonyms
-        prompt = prompt.replace("swiming", "swimming").replace("swim ", "swimming ").replace(" swim", " swimming")
-
-        # --- NEW: Normalize office ethnic/traditional/cultural day phrases ---
-        office_ethnic_patterns = [
-            "office ethnic", "office traditional", "office cultural",
-            "office ethnic day", "office traditional day", "office cultural day"
-        ]
-        # If any of these patterns are present, forcibly add "ethnic day" and "ethnic" to occasions
-        force_ethnic = any(pat in prompt for pat in office_ethnic_patterns)
-
-        # --- NEW: If prompt contains "ethnic", "traditional", or "cultural", always force ethnic/traditional ---
-        force_ethnic_general = any(word in prompt for word in ["ethnic", "traditional", "cultural"])
-
-        # Extract occasions using regex (as before)
-        occasions = re.findall(r'\b(' + '|'.join(re.escape(k) for k in OCCASION_STYLES) + r')\b', prompt)
-        # --- Add substring match for any occasion key not already in occasions ---
-        for k in OCCASION_STYLES:
-            if k not in occasions and k in prompt:
-                occasions.append(k)
-
-        # --- Synonym expansion for any matching phrase in prompt ---
-        expanded = set(occasions)
-        for k, v in OCCASION_SYNONYMS.items():
-            for syn in v:
-                if syn in prompt:
-                    expanded.add(k)
-        for occ in occasions:
-            for k, v in OCCASION_SYNONYMS.items():
-                if occ in v:
-                    expanded.add(k)
-
-        # --- NEW: Force ethnic/traditional for office ethnic/traditional/cultural day or if prompt contains those words ---
-        if force_ethnic or force_ethnic_general:
-            expanded.update(["ethnic day", "ethnic", "traditional"])
-
-        # If still nothing, fallback to "casual" for outing-like prompts
-        if not expanded:
-            if any(word in prompt for word in ["outing", "walk", "park", "shopping", "picnic"]):
-                expanded.add("casual")
-        needs_layer = "layer" in prompt or "cold" in prompt
-
-        # --- Detect vacation or trip ---
-        self.vacation_destination = None  # default
-
-        # Basic classification of cold/hot locations
-        cold_places = {
-            "kashmir", "manali", "shimla", "switzerland", "alaska", "iceland",
-            "leh", "gulmarg", "sikkim", "london", "moscow"
-        }
-        hot_places = {
-            "goa", "mumbai", "dubai", "thailand", "bali", "delhi",
-            "sydney", "miami", "cancun"
-        }
-
-        words = prompt.lower().split()
-        for word in words:
-            if word in cold_places and any(w in prompt for w in ["vacation", "trip", "travel", "holiday"]):
-                self.vacation_destination = word
-                expanded.update(["vacation"])  # Just a placeholder tag
-                needs_layer = True
-                break
-            elif word in hot_places and any(w in prompt for w in ["vacation", "trip", "travel", "holiday"]):
-                self.vacation_destination = word
-                expanded.update(["vacation", "beach party", "party", "casual"])
-                # no layer needed
-                break
-
-        return list(set(colors)), list(expanded or ["general"]), list(set(avoid)), needs_layer
-
-    def _filter_by_profile(self, items: List[Dict], profile: Dict) -> List[Dict]:
-        return [
-            item for item in items
-            if item["age_group"] in ["all", profile["age_group"]] and item["gender"] in ["unisex", profile["gender"]]
-        ]
-
-    def _color_distance(self, color1: str, color2: str) -> float:
-        def to_rgb(color):
-            css_colors = {"red": (255,0,0), "blue": (0,0,255), "green": (0,128,0), "black": (0,0,0),
-                          "white": (255,255,255), "pink": (255,192,203), "gray": (128,128,128),
-                          "yellow": (255,255,0), "purple": (128,0,128), "orange": (255,165,0),
-                          "brown": (139,69,19), "navy": (0,0,128), "gold": (255,215,0)}
-            return css_colors.get(color, (128, 128, 128))
-
-        rgb1 = sRGBColor(*[c / 255 for c in to_rgb(color1)], is_upscaled=False)
-        rgb2 = sRGBColor(*[c / 255 for c in to_rgb(color2)], is_upscaled=False)
-        lab1 = convert_color(rgb1, LabColor)
-        lab2 = convert_color(rgb2, LabColor)
-        return delta_e_cie2000(lab1, lab2)
-
-    def _color_match(self, item_tags, requested_colors, forbidden_colors) -> bool:
-        # Only consider tags that are color names
-        color_terms = {
-            "red", "blue", "green", "black", "white", "pink", "gray", "yellow",
-            "purple", "orange", "brown", "navy", "gold", "cream", "ivory", "offwhite", "beige"
-        }
-        color_tags = [tag for tag in item_tags if tag in color_terms]
-        # Strictly reject if any tag is close to a forbidden color
-        for tag in color_tags:
-            if any(self._color_distance(tag, fc) < 15 for fc in forbidden_colors):
-                return False
-        # If requested colors, require at least one tag close to a requested color
-        if requested_colors:
-            return any(self._color_distance(tag, rc) < 15 for rc in requested_colors for tag in color_tags)
-        # If no requested colors, allow if not forbidden
-        return True
-
-    def _filter_items(self, profile, occasions, colors, avoid_colors):
-        style_tags = set()
-        for occ in occasions:
-            style_tags.update(OCCASION_STYLES.get(occ, [occ]))  # fallback to occ as tag
-        items = self._filter_by_profile(self.wardrobe_db, profile)
-        filtered = [i for i in items if any(tag in i['tags'] for tag in style_tags)]
-        # Try color+style filter, but if it yields nothing, fallback to style-only
-        if colors:
-            color_filtered = [i for i in filtered if self._color_match(i["tags"], colors, avoid_colors)]
-            if color_filtered:
-                filtered = color_filtered
-        return filtered
-
-    def recommend_outfits(self, prompt: str, username: str) -> Dict:
-        if username not in USER_DB:
-            raise ValueError("User not authenticated")
-        profile = get_user_preferences(username)
-        colors, occasions, avoid, layer_needed = self.extract_prompt_requirements(prompt)
-        context = self.get_context()
-        # Ensure layer_needed is set if "layer" or "cold" in prompt or winter season
-        layer_needed = layer_needed or ("layer" in prompt or "cold" in prompt or context["season"] == "winter")
-
-        vacation = getattr(self, "vacation_destination", None)
-        # --- Vacation/trip handler: MOVE THIS BLOCK TO THE TOP ---
-        if vacation:
-            items = self._filter_by_profile(self.wardrobe_db, profile)
-            def get_style_pair(style_tag):
-                # Try strict color match for both top and bottom
-                tops = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"] and self._color_match(i["tags"], colors, avoid)]
-                bottoms = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"] and self._color_match(i["tags"], colors, avoid)]
-
-                # If both top and bottom color-matched, use them
-                if tops and bottoms:
-                    combo = [random.choice(tops), random.choice(bottoms)]
-                else:
-                    # If only one (top or bottom) color-matched, use color-matched for that and any for the other
-                    if tops:
-                        other_bottoms = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"] and self._color_match(i["tags"], [], avoid)]
-                        if not other_bottoms:
-                            other_bottoms = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"]]
-                        if other_bottoms:
-                            combo = [random.choice(tops), random.choice(other_bottoms)]
-                        else:
-                            combo = None
-                    elif bottoms:
-                        other_tops = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"] and self._color_match(i["tags"], [], avoid)]
-                        if not other_tops:
-                            other_tops = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"]]
-                        if other_tops:
-                            combo = [random.choice(other_tops), random.choice(bottoms)]
-                        else:
-                            combo = None
-                    else:
-                        # Fallback: style-only, avoid only avoided colors
-                        tops2 = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"] and self._color_match(i["tags"], [], avoid)]
-                        bottoms2 = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"] and self._color_match(i["tags"], [], avoid)]
-                        if tops2 and bottoms2:
-                            combo = [random.choice(tops2), random.choice(bottoms2)]
-                        else:
-                            # Final fallback: any top/bottom with style_tag, even if color not checked
-                            tops3 = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"]]
-                            bottoms3 = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"]]
-                            if tops3 and bottoms3:
-                                combo = [random.choice(tops3), random.choice(bottoms3)]
-                            else:
-                                # Always return a multi_piece with any 2 items if nothing found
-                                if len(items) >= 2:
-                                    return {"type": "multi_piece", "items": random.sample(items, 2)}
-                                else:
-                                    return {"type": "none", "items": []}
-
-                if not combo:
-                    if len(items) >= 2:
-                        return {"type": "multi_piece", "items": random.sample(items, 2)}
-                    else:
-                        return {"type": "none", "items": []}
-
-                if layer_needed:
-                    layers_avail = [l for l in items if l["category"] == "layer" and self._color_match(l["tags"], colors, avoid)]
-                    if not layers_avail:
-                        layers_avail = [l for l in items if l["category"] == "layer" and self._color_match(l["tags"], [], avoid)]
-                    if not layers_avail:
-                        layers_avail = [l for l in items if l["category"] == "layer"]
-                    if layers_avail:
-                        combo.append(random.choice(layers_avail))
-
-                return {"type": "multi_piece", "items": combo}
-
-            outfits = [
-                get_style_pair("traditional"),
-                get_style_pair("party"),
-                get_style_pair("formal")
-            ]
-            return {
-                "user": username,
-                "occasion": f"vacation to {vacation}",
-                "context": context,
-                "outfits": outfits
-            }
-
-        # --- Tag extraction and mapping ---
-        style_tags = set()
-        for occ in occasions:
-            style_tags.update(OCCASION_STYLES.get(occ, [occ]))  # fallback to occ as tag
-        style_tags.update(occasions)
-
-        items = self._filter_by_profile(self.wardrobe_db, profile)
-
-        def filter_category(cat, gender=None):
-            cat_items = [i for i in items if i["category"] == cat]
-            if gender:
-                cat_items = [i for i in cat_items if i["gender"] in [gender, "unisex"]]
-            return cat_items
-
-        # Color-matched items for each category
-        def color_matched(items):
-            if colors:
-                color_items = [i for i in items if self._color_match(i["tags"], colors, avoid)]
-                return color_items if color_items else []
-            return []
-
-        gender = profile.get('gender', 'unisex')
-
-        # --- Swimming occasion: ONLY swimwear, color-matched if color specified ---
-        if "swimming" in occasions or "swimming" in style_tags:
-            swimwear_items = filter_category("swimwear", gender=gender)
-            color_matched_swimwear = [i for i in swimwear_items if self._color_match(i["tags"], colors, avoid)] if colors else []
-            outfits = [{"type": "swimwear", "items": [sw]} for sw in color_matched_swimwear]
-            # Fill up to 3 with other swimwear not already included
-            if len(outfits) < 3:
-                used_names = {sw["name"] for sw in color_matched_swimwear}
-                for sw in swimwear_items:
-                    if sw["name"] not in used_names:
-                        outfits.append({"type": "swimwear", "items": [sw]})
-                        used_names.add(sw["name"])
-                    if len(outfits) == 3:
-                        break
-            while len(outfits) < 3:
-                outfits.append({"type": "none", "items": []})
-            print("Occasions:", occasions)
-            print("Style Tags:", style_tags)
-            print("Filtered Swimwear:", [i["name"] for i in swimwear_items])
-            return {
-                "user": username,
-                "occasion": ", ".join(occasions),
-                "context": context,
-                "outfits": outfits
-            }
-
-        # For one-piece, only for females
-        one_pieces = filter_category("one-piece", gender="female") + filter_category("one_piece", gender="female") if gender == "female" else []
-
-        # Prioritize tops/bottoms that match style tags (ethnic/traditional etc.)
-        tops_all = filter_category("topwear", gender=gender)
-        bottoms_all = filter_category("bottomwear", gender=gender)
-
-        # --- Strict style filtering for casual/outing-like prompts ---
-        strict_casual_filter = bool(set(style_tags) & {"casual", "comfortable", "picnic", "shopping"})
-        if strict_casual_filter:
-            tops = [t for t in tops_all if set(t["tags"]) & style_tags]
-            bottoms = [b for b in bottoms_all if set(b["tags"]) & style_tags]
-        else:
-            tops = [t for t in tops_all if any(tag in style_tags for tag in t["tags"])]
-            bottoms = [b for b in bottoms_all if any(tag in style_tags for tag in b["tags"])]
-
-        # Only fallback to all if none found
-        if not tops:
-            tops = tops_all
-        if not bottoms:
-            bottoms = bottoms_all
-
-        # --- Filter out tops/bottoms with forbidden colors ---
-        if avoid:
-            tops = [t for t in tops if self._color_match(t["tags"], [], avoid)]
-            bottoms = [b for b in bottoms if self._color_match(b["tags"], [], avoid)]
-
-        # --- Ethnic/traditional strict filter for ethnic occasions ---
-        if "ethnic" in style_tags or "traditional" in style_tags:
-            ethnic_tags = {"ethnic", "traditional"}
-            filtered_tops = [t for t in tops if any(tag in ethnic_tags for tag in t["tags"])]
-            filtered_bottoms = [b for b in bottoms if any(tag in ethnic_tags for tag in b["tags"])]
-            # Only use these if any exist, else fallback to previous
-            if filtered_tops:
-                tops = filtered_tops
-            if filtered_bottoms:
-                bottoms = filtered_bottoms
-
-        layers = filter_category("layer", gender=gender)
-
-        print("Occasions:", occasions)
-        print("Style Tags:", style_tags)
-        filtered = [i for i in items if any(tag in i['tags'] for tag in style_tags)]
-        print("Filtered Items:", [i["name"] for i in filtered])
-        print("Tops:", [i["name"] for i in tops])
-        print("Bottoms:", [i["name"] for i in bottoms])
-
-        # --- Early override for gym/activewear ---
-        active_occasions = {"gym", "hiking", "trekking", "yoga", "exercise", "camping"}
-        if any(occ in active_occasions for occ in occasions):
-            relevant_tops = [t for t in tops if any(tag in style_tags or tag in active_occasions for tag in t["tags"])]
-            relevant_bottoms = [b for b in bottoms if any(tag in style_tags or tag in active_occasions for tag in b["tags"])]
-
-            outfits = []
-            used_pairs = set()
-
-            # Generate all possible top-bottom pairs (allowing same top with different bottoms)
-            all_pairs = []
-            for t in relevant_tops:
-                for b in relevant_bottoms:
-                    all_pairs.append((t, b))
-
-            # Prioritize color-matched pairs if color is specified
-            if colors:
-                color_pairs = []
-                for t, b in all_pairs:
-                    if self._color_match(t["tags"], colors, avoid) or self._color_match(b["tags"], colors, avoid):
-                        color_pairs.append((t, b))
-                pairs_to_use = color_pairs if color_pairs else all_pairs
-            else:
-                pairs_to_use = all_pairs
-
-            # Fill up to 3 outfits, repeating pairs if needed
-            idx = 0
-            while len(outfits) < 3:
-                t, b = pairs_to_use[idx % len(pairs_to_use)]
-                outfits.append({"type": "multi_piece", "items": [t, b]})
-                idx += 1
-
-            return {
-                "user": username,
-                "occasion": ", ".join(occasions),
-                "context": context,
-                "outfits": outfits[:3]
-            }
-
-        # --- Strictly formal for office/business meeting/interview ---
-        # Only enforce strict formal wear if NO ethnic/traditional tag is present
-        if all(occ in ["office", "business meeting", "interview"] for occ in occasions) and not {"ethnic", "traditional"} & style_tags:
-
-
-            tops = [t for t in tops if "formal" in t["tags"]]
-            bottoms = [b for b in bottoms if "formal" in b["tags"]]
-            print("Strictly formal filter applied.")
-            print("Formal Tops:", [i["name"] for i in tops])
-            print("Formal Bottoms:", [i["name"] for i in bottoms])
-
-        # --- Strictly party for party occasion (including office party) ---
-        if "party" in occasions or "office party" in occasions or "beach party" in occasions:
-            party_priority_tags = {"party", "semi-formal", "summerwear", "beach party"}
-            fallback_tags = {"formal", "office party"}
-
-            party_tops = [t for t in tops if any(tag in party_priority_tags for tag in t["tags"])]
-            party_bottoms = [b for b in bottoms if any(tag in party_priority_tags for tag in b["tags"])]
-
-            # If no party-style items, include fallback formal ones
-            if not party_tops:
-                party_tops = [t for t in tops if any(tag in fallback_tags for tag in t["tags"])]
-            if not party_bottoms:
-                party_bottoms = [b for b in bottoms if any(tag in fallback_tags for tag in b["tags"])]
-
-            # --- NEW: If still empty and style_tags has ethnic/traditional, fallback to ethnic/traditional filtering ---
-            if (not party_tops or not party_bottoms) and ({"ethnic", "traditional"} & style_tags):
-                ethnic_tags = {"ethnic", "traditional"}
-                party_tops = [t for t in tops_all if any(tag in ethnic_tags for tag in t["tags"])]
-                party_bottoms = [b for b in bottoms_all if any(tag in ethnic_tags for tag in b["tags"])]
-
-            # --- Only use color-matched tops/bottoms if color is specified ---
-            if colors:
-                party_tops_color = [t for t in party_tops if self._color_match(t["tags"], colors, avoid)]
-                party_bottoms_color = [b for b in party_bottoms if self._color_match(b["tags"], colors, avoid)]
-                if party_tops_color:
-                    party_tops = party_tops_color
-                if party_bottoms_color:
-                    party_bottoms = party_bottoms_color
-
-                # --- For female: prioritize one-piece if available and color-matched ---
-                if profile.get("gender") == "female":
-                    one_pieces_party = [op for op in one_pieces if any(tag in party_priority_tags for tag in op["tags"])]
-                    one_pieces_color = [op for op in one_pieces_party if self._color_match(op["tags"], colors, avoid)]
-                    if one_pieces_color:
-                        outfits = []
-                        # Add up to 3 unique one-piece outfits
-                        for op in one_pieces_color[:3]:
-                            outfits.append({"type": "one_piece", "items": [op]})
-                        # If less than 3, fill with top+bottom combos as before
-                        needed = 3 - len(outfits)
-                        if party_tops and party_bottoms and needed > 0:
-                            top = party_tops[0]
-                            unique_bottoms = party_bottoms
-                            for i in range(needed):
-                                bottom = unique_bottoms[i % len(unique_bottoms)]
-                                outfits.append({"type": "multi_piece", "items": [top, bottom]})
-                        return {
-                            "user": username,
-                            "occasion": ", ".join(occasions),
-                            "context": context,
-                            "outfits": outfits
-                        }
-
-                # Always provide 3 full outfits: repeat top with different bottoms if needed, but use different bottoms if possible
-                outfits = []
-                used_bottoms = set()
-                if party_tops and party_bottoms:
-                    top = party_tops[0]  # Use the color-matching or prioritized top
-                    for b in party_bottoms:
-                        if b["name"] not in used_bottoms:
-                            combo = [top, b]
-                            if layer_needed and layers:
-                                combo.append(random.choice(layers))
-                            outfits.append({"type": "multi_piece", "items": combo})
-                            used_bottoms.add(b["name"])
-                            if len(outfits) == 3:
-                                break
-                    # If not enough outfits, repeat same top with unused bottoms
-                    while len(outfits) < 3:
-                        b = random.choice(party_bottoms)
-                        combo = [top, b]
-                        if layer_needed and layers:
-                            combo.append(random.choice(layers))
-                        outfits.append({"type": "multi_piece", "items": combo})
-                # --- NEW: If still no outfits, fallback to ethnic/traditional combos ---
-                if not outfits and ({"ethnic", "traditional"} & style_tags):
-                    ethnic_tags = {"ethnic", "traditional"}
-                    fallback_tops = [t for t in tops_all if any(tag in ethnic_tags for tag in t["tags"])]
-                    fallback_bottoms = [b for b in bottoms_all if any(tag in ethnic_tags for tag in b["tags"])]
-                    for t, b in zip(fallback_tops, fallback_bottoms):
-                        outfits.append({"type": "multi_piece", "items": [t, b]})
-                        if len(outfits) == 3:
-                            break
-                # --- Prevent crash if still empty ---
-                if not outfits:
-                    return {
-                        "user": username,
-                        "occasion": ", ".join(occasions),
-                        "context": context,
-                        "outfits": [{"type": "none", "items": []}] * 3
-                    }
-                return {
-                    "user": username,
-                    "occasion": ", ".join(occasions),
-                    "context": context,
-                    "outfits": outfits
-                }
-
-            tops = party_tops
-            bottoms = party_bottoms
-            print("Prioritized partywear for office party.")
-
-            print("Strictly party filter applied.")
-            print("Party Tops:", [i["name"] for i in tops])
-            print("Party Bottoms:", [i["name"] for i in bottoms])
-
-        # --- Move color-matched variables here, after all filtering ---
-        one_pieces_color = color_matched(one_pieces)
-        tops_color = color_matched(tops)
-        bottoms_color = color_matched(bottoms)
-        layers_color = color_matched(layers)
-        print("Color-matched Tops:", [t["name"] for t in tops_color])
-
-        outfits = []
-        used = set()
-
-        # --- For females: one-piece outfit if available ---
-        strictly_formal = all(occ in ["office", "business meeting", "interview"] for occ in occasions)
-        exclude_one_piece_tags = {"ritual", "ceremony", "ethnic", "traditional"}
-        exclude_one_piece_casual = {"casual", "comfortable", "picnic", "shopping"}
-        if (
-            gender == "female"
-            and one_pieces
-            and not strictly_formal
-            and not (exclude_one_piece_tags & style_tags)
-            and not (exclude_one_piece_casual & style_tags)
-        ):
-            op_choices = one_pieces_color if one_pieces_color else one_pieces
-            # Only add one one-piece outfit (with layer if needed)
-            op = random.choice([o for o in op_choices if o["name"] not in used])
-            outfit = [op]
-            used.add(op["name"])
-            if layer_needed and layers:
-                lyr_choices = layers_color if layers_color else layers
-                avail_layers = [l for l in lyr_choices if l["name"] not in used]
-                if avail_layers:
-                    lyr = random.choice(avail_layers)
-                    outfit.append(lyr)
-                    used.add(lyr["name"])
-            outfits.append({"type": "one_piece", "items": outfit})
-
-        # --- Always include at least one top+bottom+layer outfit if layer is needed ---
-        if layer_needed and tops and bottoms and layers:
-            # Try to avoid duplicates
-            tb_pairs = []
-            for t in tops:
-                for b in bottoms:
-                    tb_pairs.append((t, b))
-            random.shuffle(tb_pairs)
-            added = 0
-            for t, b in tb_pairs:
-                combo = [t, b]
-                lyr_choices = layers_color if layers_color else layers
-                avail_layers = [l for l in lyr_choices if l["name"] not in [i["name"] for i in combo]]
-                if avail_layers:
-                    lyr = random.choice(avail_layers)
-                    combo.append(lyr)
-                if not any(set(i["name"] for i in combo) == set(j["name"] for j in o["items"]) for o in outfits):
-                    outfits.append({"type": "multi_piece", "items": combo})
-                    added += 1
-                if added >= 2:
-                    break
-
-        # --- Always include swimwear for swimming occasion ---
-        if "swimming" in occasions or "swimming" in style_tags:
-            swimwear_items = filter_category("swimwear", gender=gender)
-            for sw in swimwear_items:
-                if sw["name"] not in used:
-                    outfits.append({"type": "swimwear", "items": [sw]})
-                    used.add(sw["name"])
-                    if len(outfits) >= 3:
-                        break
-        else:
-            # --- Handle standalone swimwear outfits (legacy logic) ---
-            swimwear_items = [i for i in filtered if i["category"] == "swimwear"]
-            if swimwear_items:
-                for sw in swimwear_items:
-                    if sw["name"] not in used:
-                        outfits.append({"type": "swimwear", "items": [sw]})
-                        used.add(sw["name"])
-                        if len(outfits) >= 3:
-                            break
-
-        # Adjust how many more outfits we need after adding swimwear
-        needed = 3 - len(outfits)
-
-        # --- Top+Bottom outfits ---
-        def make_top_bottom_outfits(top_list, bottom_list, layer_list, n, prefer_color=True):
-            combos = []
-            used_bottoms = set()
-            used_pairs = set()
-
-            def maybe_add_layer(combo):
-                if layer_needed:
-                    lyr_choices = layers_color if layers_color else layer_list
-                    avail_layers = [l for l in lyr_choices if l["name"] not in [i["name"] for i in combo]]
-                    if avail_layers:
-                        filtered_layers = [l for l in avail_layers if any(tag in style_tags for tag in l["tags"])]
-                        selected = filtered_layers if filtered_layers else avail_layers
-                        lyr = random.choice(selected)
-                        combo.append(lyr)
-
-            if prefer_color and (tops_color or bottoms_color):
-                for t in tops_color:
-                    for b in bottom_list:
-                        pair = (t["name"], b["name"])
-                        if b["name"] in used_bottoms or pair in used_pairs:
-                            continue
-                        if not (self._color_match(t["tags"], colors, []) or self._color_match(b["tags"], colors, [])):
-                            continue
-                        combo = [t, b]
-                        used_bottoms.add(b["name"])
-                        used_pairs.add(pair)
-                        maybe_add_layer(combo)
-                        combos.append({"type": "multi_piece", "items": combo})
-                        if len(combos) >= n:
-                            return combos
-
-                for b in bottoms_color:
-                    if b["name"] in used_bottoms:
-                        continue
-                    for t in top_list:
-                        pair = (t["name"], b["name"])
-                        if pair in used_pairs:
-                            continue
-                        if not (self._color_match(t["tags"], colors, []) or self._color_match(b["tags"], colors, [])):
-                            continue
-                        combo = [t, b]
-                        used_bottoms.add(b["name"])
-                        used_pairs.add(pair)
-                        maybe_add_layer(combo)
-                        combos.append({"type": "multi_piece", "items": combo})
-                        if len(combos) >= n:
-                            return combos
-
-            if colors and len(tops_color) == 1:
-                top = tops_color[0]
-                bottom_used = set()
-                for b in bottoms_color + bottom_list:
-                    if b["name"] in bottom_used:
-                        continue
-                    pair = (top["name"], b["name"])
-                    if pair in used_pairs:
-                        continue
-                    combo = [top, b]
-                    used_pairs.add(pair)
-                    bottom_used.add(b["name"])
-                    maybe_add_layer(combo)
-                    combos.append({"type": "multi_piece", "items": combo})
-                    if len(combos) >= n - 1:
-                        break
-                for t in top_list:
-                    for b in bottom_list:
-                        pair = (t["name"], b["name"])
-                        if pair in used_pairs or t["name"] == top["name"]:
-                            continue
-                        if self._color_match(t["tags"], colors, []):
-                            continue
-                        combo = [t, b]
-                        maybe_add_layer(combo)
-                        combos.append({"type": "multi_piece", "items": combo})
-                        return combos[:n]
-                return combos[:n]
-
-            if not colors:
-                used_tops = set()
-                used_bottoms = set()
-                for t in top_list:
-                    for b in bottom_list:
-                        pair = (t["name"], b["name"])
-                        if t["name"] in used_tops or b["name"] in used_bottoms or pair in used_pairs:
-                            continue
-                        combo = [t, b]
-                        used_tops.add(t["name"])
-                        used_bottoms.add(b["name"])
-                        used_pairs.add(pair)
-                        maybe_add_layer(combo)
-                        combos.append({"type": "multi_piece", "items": combo})
-                        if len(combos) >= n:
-                            return combos
-                for t in top_list:
-                    for b in bottom_list:
-                        pair = (t["name"], b["name"])
-                        if pair in used_pairs:
-                            continue
-                        combo = [t, b]
-                        maybe_add_layer(combo)
-                        combos.append({"type": "multi_piece", "items": combo})
-                        if len(combos) >= n:
-                            return combos
-                return combos
-
-            for t in top_list:
-                for b in bottom_list:
-                    pair = (t["name"], b["name"])
-                    if b["name"] in used_bottoms or pair in used_pairs:
-                        continue
-                    if colors and (self._color_match(t["tags"], colors, []) or self._color_match(b["tags"], colors, [])):
-                        continue
-                    combo = [t, b]
-                    used_bottoms.add(b["name"])
-                    used_pairs.add(pair)
-                    maybe_add_layer(combo)
-                    combos.append({"type": "multi_piece", "items": combo})
-                    if len(combos) >= n:
-                        return combos
-            return combos
-
-
-        # How many more outfits needed?
-        needed = 3 - len(outfits)
-        # Try to fill with color-matched first, then fallback to occasion-matched
-        combos = make_top_bottom_outfits(tops, bottoms, layers, needed, prefer_color=True)
-        outfits.extend(combos)
-        needed = 3 - len(outfits)
-        if needed > 0:
-            combos = make_top_bottom_outfits(tops, bottoms, layers, needed, prefer_color=False)
-            outfits.extend(combos)
-
-        # --- Ensure no 'none' outfits are returned ---
-        if len(outfits) < 3:
-            # Attempt to reuse tops with different bottoms
-            used_pairs = set(
-                (item["name"] for item in outfit["items"] if item["category"] in ["topwear", "bottomwear"])
-                for outfit in outfits
-            )
-            extra_outfits = []
-            for t in tops:
-                for b in bottoms:
-                    pair = (t["name"], b["name"])
-                    if pair not in used_pairs:
-                        combo = [t, b]
-                        # Add layer if needed
-                        if layer_needed and layers:
-                            lyr = random.choice(layers)
-                            combo.append(lyr)
-                        extra_outfits.append({"type": "multi_piece", "items": combo})
-                        used_pairs.add(pair)
-                        if len(outfits) + len(extra_outfits) >= 3:
-                            break
-                if len(outfits) + len(extra_outfits) >= 3:
-                    break
-            outfits.extend(extra_outfits[:3 - len(outfits)])
-
-        # Final fallback: if still not 3, reuse existing outfits with different bottoms
-        while len(outfits) < 3:
-            t = random.choice(tops)
-            b = random.choice(bottoms)
-            combo = [t, b]
-            if layer_needed and layers:
-                combo.append(random.choice(layers))
-            outfits.append({"type": "multi_piece", "items": combo})
-
-        # --- Special handling for active/sport occasions ---
-        active_occasions = {"gym", "hiking", "trekking", "yoga", "exercise", "camping"}
-        if any(occ in active_occasions for occ in occasions):
-            used_top = set()
-            used_bottom = set()
-            # Only use tops/bottoms that match style tags for these occasions
-            relevant_tops = [t for t in tops if any(tag in active_occasions or tag in style_tags for tag in t["tags"])]
-            relevant_bottoms = [b for b in bottoms if any(tag in active_occasions or tag in style_tags for tag in b["tags"])]
-            # Prioritize color-matched items
-            tops_color = [t for t in relevant_tops if self._color_match(t["tags"], colors, avoid)]
-            bottoms_color = [b for b in relevant_bottoms if self._color_match(b["tags"], colors, avoid)]
-            top_priority = tops_color + [t for t in relevant_tops if t["name"] not in [i["name"] for i in tops_color]]
-            bottom_priority = bottoms_color + [b for b in relevant_bottoms if b["name"] not in [i["name"] for i in bottoms_color]]
-
-            # First: Add color-matched combo
-            for t in top_priority:
-                for b in bottom_priority:
-                    if self._color_match(t["tags"], colors, avoid) or self._color_match(b["tags"], colors, avoid):
-                        if t["name"] not in used_top and b["name"] not in used_bottom:
-                            outfits.append({"type": "multi_piece", "items": [t, b]})
-                            used_top.add(t["name"])
-                            used_bottom.add(b["name"])
-                            break
-                if len(outfits) >= 1:
-                    break
-
-            # Second: Add 2 more from style-matching (no color priority)
-            for t in relevant_tops:
-                for b in relevant_bottoms:
-                    if t["name"] not in used_top and b["name"] not in used_bottom:
-                        outfits.append({"type": "multi_piece", "items": [t, b]})
-                        used_top.add(t["name"])
-                        used_bottom.add(b["name"])
-                        if len(outfits) >= 3:
-                            break
-                if len(outfits) >= 3:
-                    break
-
-            # Final fallback: fill if < 3
-            while len(outfits) < 3:
-                outfits.append({"type": "none", "items": []})
-
-            return {
-                "user": username,
-                "occasion": ", ".join(occasions),
-                "context": context,
-                "outfits": outfits[:3]
-            }
-
-        # --- Vacation/trip handler ---
-        if vacation:
-            def get_style_pair(style_tag):
-                # Try strict color match for both top and bottom
-                tops = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"] and self._color_match(i["tags"], colors, avoid)]
-                bottoms = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"] and self._color_match(i["tags"], colors, avoid)]
-
-                # If both top and bottom color-matched, use them
-                if tops and bottoms:
-                    combo = [random.choice(tops), random.choice(bottoms)]
-                else:
-                    # If only one (top or bottom) color-matched, use color-matched for that and any for the other
-                    if tops:
-                        other_bottoms = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"] and self._color_match(i["tags"], [], avoid)]
-                        if not other_bottoms:
-                            other_bottoms = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"]]
-                        if other_bottoms:
-                            combo = [random.choice(tops), random.choice(other_bottoms)]
-                        else:
-                            combo = None
-                    elif bottoms:
-                        other_tops = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"] and self._color_match(i["tags"], [], avoid)]
-                        if not other_tops:
-                            other_tops = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"]]
-                        if other_tops:
-                            combo = [random.choice(other_tops), random.choice(bottoms)]
-                        else:
-                            combo = None
-                    else:
-                        # Fallback: style-only, avoid only avoided colors
-                        tops2 = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"] and self._color_match(i["tags"], [], avoid)]
-                        bottoms2 = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"] and self._color_match(i["tags"], [], avoid)]
-                        if tops2 and bottoms2:
-                            combo = [random.choice(tops2), random.choice(bottoms2)]
-                        else:
-                            # Final fallback: any top/bottom with style_tag, even if color not checked
-                            tops3 = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"]]
-                            bottoms3 = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"]]
-                            if tops3 and bottoms3:
-                                combo = [random.choice(tops3), random.choice(bottoms3)]
-                            else:
-                                return {"type": "none", "items": []}
-
-                if not combo:
-                    return {"type": "none", "items": []}
-
-                if layer_needed:
-                    layers_avail = [l for l in items if l["category"] == "layer" and self._color_match(l["tags"], colors, avoid)]
-                    if not layers_avail:
-                        layers_avail = [l for l in items if l["category"] == "layer" and self._color_match(l["tags"], [], avoid)]
-                    if not layers_avail:
-                        layers_avail = [l for l in items if l["category"] == "layer"]
-                    if layers_avail:
-                        combo.append(random.choice(layers_avail))
-
-                return {"type": "multi_piece", "items": combo}
-
-            outfits = [
-                get_style_pair("traditional"),
-                get_style_pair("party"),
-                get_style_pair("formal")
-            ]
-            return {
-                "user": username,
-                "occasion": f"vacation to {vacation}",
-                "context": context,
-                "outfits": outfits
-            }
-
-        return {
-            "user": username,
-            "occasion": ", ".join(occasions),
-            "context": context,
-            "outfits": outfits[:3]
-        }
-def show_outfits_html(result):
-    html = """
-    <html>
-    <head>
-        <title>Recommended Outfits</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; }}
-            .outfit {{ margin-bottom: 30px; }}
-            .item {{ margin-left: 20px; }}
-            img {{ max-width: 200px; max-height: 200px; display: block; margin-top: 5px; }}
-        </style>
-    </head>
-    <body>
-        <h2>Recommended Outfits for {user}</h2>
-        <p><b>Occasion:</b> {occasion}</p>
-        <p><b>Context:</b> {context}</p>
-    """.format(
-        user=result['user'],
-        occasion=result['occasion'],
-        context=", ".join(f"{k}: {v}" for k, v in result['context'].items())
-    )
-    for idx, outfit in enumerate(result['outfits'], 1):
-        html += f'<div class="outfit"><h3>Outfit {idx} ({outfit["type"]})</h3>'
-        for item in outfit['items']:
-            html += f'<div class="item"><b>{item["name"]} ({item["category"]})</b><br>'
-            img_path = item.get("image", "")
-            if img_path and os.path.exists(img_path):
-                html += f'<img src="file:///{os.path.abspath(img_path)}">'
-            elif img_path:
-                html += f'<img src="{img_path}">'
-            else:
-                html += '<i>No image available</i>'
-            html += '</div>'
-        html += '</div>'
-    html += "</body></html>"
-
-    with tempfile.NamedTemporaryFile('w', delete=False, suffix='.html', encoding='utf-8') as f:
-        f.write(html)
-        temp_html_path = f.name
-    webbrowser.open('file://' + os.path.abspath(temp_html_path))
-
-def show_all_outfits(wardrobe_path):
-    with open(wardrobe_path, "r", encoding="utf-8") as f:
-        wardrobe = json.load(f)
-    html = """
-    <html>
-    <head>
-        <title>All Outfits</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; }}
-            .item {{ margin-bottom: 20px; }}
-            img {{ max-width: 200px; max-height: 200px; display: block; margin-top: 5px; }}
-        </style>
-    </head>
-    <body>
-        <h2>All Outfits in Wardrobe</h2>
-    """
-    for item in wardrobe:
-        html += f'<div class="item"><b>{item["name"]} ({item["category"]})</b><br>'
-        img_path = item.get("image", "")
-        if img_path and os.path.exists(img_path):
-            html += f'<img src="file:///{os.path.abspath(img_path)}">'
-        elif img_path:
-            html += f'<img src="{img_path}">'
-        else:
-            html += '<i>No image available</i>'
-        html += '</div>'
-    html += "</body></html>"
-
-    with tempfile.NamedTemporaryFile('w', delete=False, suffix='.html', encoding='utf-8') as f:
-        f.write(html)
-        temp_html_path = f.name
-    webbrowser.open('file://' + os.path.abspath(temp_html_path))
-
-# --- Interactive Terminal Entry ---
-if __name__ == "__main__":
-    print("Welcome to the Smart Outfit Recommender")
-    print("1. Show all outfits in wardrobe")
-    print("2. Get outfit recommendations")
-    choice = input("Enter your choice (1/2): ").strip()
-    if choice == "1":
-        show_all_outfits("wardrobe.json")
-        exit()
-    username = input("Enter your name: ").strip().lower()
-    password = input("Set or enter your password: ").strip()
-
-    if username not in USER_DB:
-        age_group = input("Enter your age group (toddler/teen/adult/senior): ").strip().lower()
-        gender = input("Enter your gender (male/female/unisex): ").strip().lower()
-        register_user(username, password, {"age_group": age_group, "gender": gender})
-    else:
-        if not authenticate_user(username, password):
-            print("Invalid password. Exiting.")
-            exit()
-
-    recommender = SmartOutfitRecommender("wardrobe.json")
-    while True:
-        print("\nAvailable occasions include:")
-        print(", ".join(sorted(OCCASION_STYLES.keys())))
-        print("Please select an occasion from the above list.")
-        occasion_input = input("Occasion (or type 'exit' to quit): ").strip()
-        if occasion_input.lower() == "exit":
-            print("Goodbye!")
-            break
-        # Optionally, allow user to add more details (color, avoid, etc.)
-        extra_prompt = input("Any specific preferences? (e.g. color, avoid, layering) If none, press Enter: ").strip()
-        if extra_prompt:
-            prompt = f"{occasion_input} {extra_prompt}"
-        else:
-            prompt = occasion_input
-        result = recommender.recommend_outfits(prompt, username)
-        print("\nRecommended Outfits:")
-        for idx, outfit in enumerate(result['outfits'], 1):
-            print(f"\nOutfit {idx} ({outfit['type']}):")
-            for item in outfit['items']:
-                print(f"  - {item['name']} ({item['category']})")
-                print(f"    Image: {item.get('image', 'No image available')}")
-        # Show HTML popup with images
-        show_outfits_html(result)
-
+# vacation and trip handler for SmartOutfitRecommender
+import datetime
+import functools
+from collections import defaultdict
+from itertools import islice, product
+import random
+import re
+import json
+import hashlib
+import logging
+import hmac
+import math
+import secrets
+import sys
+import threading
+from typing import List, Dict, Tuple
+import tempfile
+import webbrowser
+import os
+
+try:
+    import orjson  # Rust JSON parser, several times faster than stdlib
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+USER_DB = {}
+
+# Bumped on every preference change so recommenders can drop cached results
+# computed under old preferences.
+_PREFS_VERSION = 0
+
+OCCASION_STYLES = {
+    "interview": ["formal"],
+    "business meeting": ["formal"],
+    "office": ["formal", "semi-formal"],
+    "office party": ["semi-formal", "party"],
+    "office ethnic day": ["ethnic"],
+    "college ethnic day": ["ethnic"],
+    "ethnic day": ["ethnic"],
+    "wedding": [ "party"],
+    "ritual": ["ethnic", "traditional"],
+    "home ritual": ["ethnic", "traditional"],
+    "ceremony": ["ethnic", "formal"],
+    "temple visit": ["ethnic", "traditional"],
+    "birthday party": ["party"],
+    "party": ["party"],
+    "casual outing": ["casual", "shopping", "picnic"],
+    "picnic": ["casual", "comfortable", "picnic", "shopping"],
+    "shopping": ["casual", "shopping", "picnic"],
+    "date": ["party", "smart-casual"],
+    "beach party": ["party", "summerwear"],
+    "kids party": ["colorful", "casual"],
+    "kids outing": ["casual", "comfortable"],
+    "family outing": ["casual", "semi-formal"],
+    "family gathering": ["casual", "ethnic", "semi-formal"],
+    "school": ["uniform", "casual"],
+    "school function": ["ethnic", "formal"],
+    "tuition": ["casual"],
+    "cooking": ["comfortable"],
+    "swimming": ["swim", "swimwear", "swiming"],
+    "sports": ["gym", "yoga", "camping", "trekking", "running","hiking"],
+    "gym": ["yoga", "hiking", "camping", "trekking", "running"],
+    "exercise": ["gym", "yoga", "hiking", "camping", "trekking", "running"],
+    
+    "yoga": ["gym", "hiking", "camping", "trekking", "running"],
+    "meditation": ["yoga"],
+    "hiking": ["gym", "yoga", "camping", "trekking", "running"],
+    "camping": ["gym", "yoga", "hiking", "trekking", "running"],
+    "trekking": ["gym", "yoga", "camping", "hiking", "running"],
+    "mountain climbing": ["gym", "yoga", "camping", "trekking", "running","hiking"],
+    "gardening": ["casual","camping"]
+}
+
+OCCASION_SYNONYMS = {
+    "party": ["birthday party", "beach party", "wedding", "date", "office party", "officeparty"],
+    "gym": ["yoga", "hiking", "camping", "trekking", "running", "exercise"],
+    "shopping": ["mall", "buying clothes", "store visit"],
+    "picnic": ["outdoor fun", "park outing"]
+}
+
+# Style tags get compared against item tags constantly; interning both sides
+# (wardrobe tags are interned at load) makes those equality checks pointer
+# compares inside the set operations.
+OCCASION_STYLES = {
+    sys.intern(k): [sys.intern(t) for t in v] for k, v in OCCASION_STYLES.items()
+}
+
+# Tag bitsets: every tag maps to one bit, so "does this item share a tag
+# with this query set" is one integer AND instead of a frozenset
+# intersection. Python ints are arbitrary width, so the vocabulary is never
+# capped; query words nothing in the wardrobe carries simply get bits no
+# item has set.
+_TAG_VOCAB: Dict[str, int] = {}
+
+# Per-item predicate flags filled in by one annotation walk per request
+# (see _recommend_impl): the branches below it test these bits instead of
+# each redoing its own tag/color intersections over the candidate lists.
+(_F_STYLE, _F_ETHNIC, _F_PARTY, _F_FALLBACK, _F_ACTIVE, _F_FORMAL,
+ _F_AVOID_OK, _F_COLOR_OK) = (1 << i for i in range(8))
+
+def _tag_bits(tags) -> int:
+    bits = 0
+    vocab = _TAG_VOCAB
+    for t in tags:
+        b = vocab.get(t)
+        if b is None:
+            b = 1 << len(vocab)
+            vocab[t] = b
+        bits |= b
+    return bits
+
+# Compiled once; rebuilding these per prompt costs an O(keys) regex compile
+# on every recommendation.
+#
+# Request markers ("in blue") and avoid markers ("avoid black") share one
+# scan. The trailing word sits in a lookahead so a marker inside another
+# marker's word ("not in blue") still fires, exactly as the two separate
+# regexes used to; extract_prompt_requirements tracks the consumed end per
+# marker class to keep their old non-overlapping behaviour.
+_MARKER_RE = re.compile(
+    r"\b(?:(?P<req>in|with|wearing|colour|color|shade of)"
+    r"|(?P<avoid>avoid|not|no|don'?t want|skip))(?=\s+(?P<word>\w+))"
+)
+_NEAR_WHITE_RE = re.compile(r"offwhite|off-white|cream|ivory|beige")
+
+# Bare words whose mere presence in the prompt (substring, matching the old
+# `word in prompt` checks) steers the request; they ride along in the same
+# scan as the occasion phrases.
+_ETHNIC_WORDS = frozenset({"ethnic", "traditional", "cultural"})
+_OUTING_WORDS = frozenset({"outing", "walk", "park", "shopping", "picnic"})
+_TRAVEL_WORDS = frozenset({"vacation", "trip", "travel", "holiday"})
+_LAYER_WORDS = frozenset({"layer", "cold"})
+
+# Every occasion key, synonym and bare word folded into one scan. The
+# lookahead alternation reports the longest phrase starting at each position
+# (overlaps included) and _CONTAINED expands each hit to the shorter
+# vocabulary phrases inside it, so one pass over the prompt finds exactly
+# what the old per-key `k in prompt` loops found.
+_SYNONYM_TO_OCCASION = {syn: k for k, v in OCCASION_SYNONYMS.items() for syn in v}
+_PHRASE_VOCAB = frozenset(OCCASION_STYLES) | frozenset(_SYNONYM_TO_OCCASION)
+_SCAN_VOCAB = _PHRASE_VOCAB | _ETHNIC_WORDS | _OUTING_WORDS | _TRAVEL_WORDS | _LAYER_WORDS
+_PHRASE_RE = re.compile(
+    r'(?=(' + '|'.join(re.escape(p) for p in sorted(_SCAN_VOCAB, key=len, reverse=True)) + r'))'
+)
+_CONTAINED = {p: frozenset(q for q in _SCAN_VOCAB if q in p) for p in _SCAN_VOCAB}
+
+# Vacation classification; matched against whitespace-split words.
+_COLD_PLACES = frozenset({
+    "kashmir", "manali", "shimla", "switzerland", "alaska", "iceland",
+    "leh", "gulmarg", "sikkim", "london", "moscow"
+})
+_HOT_PLACES = frozenset({
+    "goa", "mumbai", "dubai", "thailand", "bali", "delhi",
+    "sydney", "miami", "cancun"
+})
+
+# Occasion and tag groups consulted on every recommendation; module-level
+# frozensets so the hot path does set algebra instead of rebuilding literal
+# lists and sets per request.
+_FORMAL_OCC = frozenset({"office", "business meeting", "interview"})
+_ACTIVE_OCCASIONS = frozenset({"gym", "hiking", "trekking", "yoga", "exercise", "camping"})
+_PARTY_OCCASIONS = frozenset({"party", "office party", "beach party"})
+_ETHNIC_TAGS = frozenset({"ethnic", "traditional"})
+_PARTY_PRIORITY_TAGS = frozenset({"party", "semi-formal", "summerwear", "beach party"})
+_FALLBACK_TAGS = frozenset({"formal", "office party"})
+_EXCLUDE_ONE_PIECE_TAGS = frozenset({"ritual", "ceremony", "ethnic", "traditional"})
+_EXCLUDE_ONE_PIECE_CASUAL = frozenset({"casual", "comfortable", "picnic", "shopping"})
+
+
+_CSS_COLORS = {"red": (255,0,0), "blue": (0,0,255), "green": (0,128,0), "black": (0,0,0),
+               "white": (255,255,255), "pink": (255,192,203), "gray": (128,128,128),
+               "yellow": (255,255,0), "purple": (128,0,128), "orange": (255,165,0),
+               "brown": (139,69,19), "navy": (0,0,128), "gold": (255,215,0)}
+
+def _srgb_to_lab(rgb):
+    # sRGB (0-255) -> CIELAB under D65, the same pipeline colormath ran.
+    # Only exercised a handful of times at import to seed the closeness
+    # table below.
+    def linearize(c):
+        c /= 255
+        return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+    r, g, b = (linearize(c) for c in rgb)
+    x = (0.4124564 * r + 0.3575761 * g + 0.1804375 * b) / 0.95047
+    y = 0.2126729 * r + 0.7151522 * g + 0.0721750 * b
+    z = (0.0193339 * r + 0.1191920 * g + 0.9503041 * b) / 1.08883
+
+    def f(t):
+        return t ** (1 / 3) if t > 216 / 24389 else (24389 / 27 * t + 16) / 116
+
+    fx, fy, fz = f(x), f(y), f(z)
+    return 116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)
+
+
+def _delta_e_cie2000(lab1, lab2) -> float:
+    # CIEDE2000 colour difference (Sharma et al. 2005), self-contained so
+    # the table precompute does not pull in the colormath dependency.
+    L1, a1, b1 = lab1
+    L2, a2, b2 = lab2
+    avg_L = (L1 + L2) / 2
+    C1 = math.hypot(a1, b1)
+    C2 = math.hypot(a2, b2)
+    avg_C = (C1 + C2) / 2
+    G = 0.5 * (1 - math.sqrt(avg_C ** 7 / (avg_C ** 7 + 25 ** 7)))
+    a1p, a2p = a1 * (1 + G), a2 * (1 + G)
+    C1p, C2p = math.hypot(a1p, b1), math.hypot(a2p, b2)
+    avg_Cp = (C1p + C2p) / 2
+    h1p = math.degrees(math.atan2(b1, a1p)) % 360
+    h2p = math.degrees(math.atan2(b2, a2p)) % 360
+    if C1p * C2p == 0:
+        avg_hp = h1p + h2p
+        dhp = 0.0
+    else:
+        hsum = h1p + h2p
+        if abs(h1p - h2p) <= 180:
+            avg_hp = hsum / 2
+        elif hsum < 360:
+            avg_hp = (hsum + 360) / 2
+        else:
+            avg_hp = (hsum - 360) / 2
+        dhp = h2p - h1p
+        if dhp > 180:
+            dhp -= 360
+        elif dhp < -180:
+            dhp += 360
+    T = (1 - 0.17 * math.cos(math.radians(avg_hp - 30))
+         + 0.24 * math.cos(math.radians(2 * avg_hp))
+         + 0.32 * math.cos(math.radians(3 * avg_hp + 6))
+         - 0.20 * math.cos(math.radians(4 * avg_hp - 63)))
+    dLp = L2 - L1
+    dCp = C2p - C1p
+    dHp = 2 * math.sqrt(C1p * C2p) * math.sin(math.radians(dhp) / 2)
+    S_L = 1 + 0.015 * (avg_L - 50) ** 2 / math.sqrt(20 + (avg_L - 50) ** 2)
+    S_C = 1 + 0.045 * avg_Cp
+    S_H = 1 + 0.015 * avg_Cp * T
+    d_theta = 30 * math.exp(-(((avg_hp - 275) / 25) ** 2))
+    R_T = -2 * math.sqrt(avg_Cp ** 7 / (avg_Cp ** 7 + 25 ** 7)) * math.sin(math.radians(2 * d_theta))
+    return math.sqrt((dLp / S_L) ** 2 + (dCp / S_C) ** 2 + (dHp / S_H) ** 2
+                     + R_T * (dCp / S_C) * (dHp / S_H))
+
+
+@functools.lru_cache(maxsize=None)
+def _color_distance(color1: str, color2: str) -> float:
+    # Pure function of two color names from a small vocabulary; the cache
+    # keeps the Lab conversions to one per distinct pair instead of one per
+    # item-pair comparison.
+    def to_rgb(color):
+        return _CSS_COLORS.get(color, (128, 128, 128))
+
+    return _delta_e_cie2000(_srgb_to_lab(to_rgb(color1)), _srgb_to_lab(to_rgb(color2)))
+
+
+# Tag values that name colors; everything else in an item's tag list is a
+# style tag and irrelevant to color matching.
+_COLOR_TERMS = frozenset({
+    "red", "blue", "green", "black", "white", "pink", "gray", "yellow",
+    "purple", "orange", "brown", "navy", "gold", "cream", "ivory", "offwhite", "beige"
+})
+
+
+def _color_key(color: str) -> str:
+    # Names outside the RGB vocabulary all share gray's coordinates in
+    # _color_distance, so they are interchangeable with "gray" here.
+    return color if color in _CSS_COLORS else "gray"
+
+# The recommender only ever asks "is the distance under 15?", so the yes/no
+# answer for every pair is computed once at import and the hot path does a
+# single set lookup instead of a CIEDE2000 computation.
+_COLOR_CLOSE = frozenset(
+    (a, b) for a in _CSS_COLORS for b in _CSS_COLORS if _color_distance(a, b) < 15
+)
+
+# Acceptable-neighbor sets: _NEIGHBORS[c] is every color term within the
+# closeness threshold of c. With these, a color check collapses to a set
+# intersection against the item's _color_tags. Names outside the vocabulary
+# share gray's neighbors, mirroring _color_key.
+_NEIGHBORS = {
+    c: frozenset(t for t in _COLOR_TERMS if (_color_key(t), _color_key(c)) in _COLOR_CLOSE)
+    for c in _COLOR_TERMS
+}
+
+
+def _color_mask(colors):
+    # Union of acceptable-neighbor sets for a request's color list.
+    mask = frozenset()
+    for c in colors:
+        mask |= _NEIGHBORS.get(c, _NEIGHBORS["gray"])
+    return mask
+
+
+def hash_password(password: str) -> bytes:
+    # Raw 32-byte digest: comparisons and storage skip the hex encoding.
+    return hashlib.sha256(password.encode()).digest()
+
+def register_user(username: str, password: str, preferences: Dict = None):
+    if username in USER_DB:
+        raise ValueError("User already exists")
+    USER_DB[username] = {
+        "password_hash": hash_password(password),
+        "preferences": preferences or {"age_group": "adult", "gender": "unisex"}
+    }
+
+# Verified against when the username does not exist, so unknown and known
+# usernames cost the same amount of hashing (no enumeration via timing).
+_DUMMY_HASH = hash_password(secrets.token_urlsafe(20))
+
+def user_exists(username: str) -> bool:
+    return username in USER_DB
+
+def authenticate_user(username: str, password: str) -> bool:
+    # Constant-time comparison: == exits on the first mismatched byte, which
+    # leaks prefix information and makes auth latency input-dependent.
+    user = USER_DB.get(username)
+    stored = user["password_hash"] if user else _DUMMY_HASH
+    valid = hmac.compare_digest(stored, hash_password(password))
+    return user is not None and valid
+
+def get_user_preferences(username: str) -> Dict:
+    return USER_DB[username]["preferences"]
+
+def set_user_preferences(username: str, preferences: Dict):
+    global _PREFS_VERSION
+    user = USER_DB.get(username)
+    if user is not None and user["preferences"] != preferences:
+        user["preferences"] = preferences
+        # Only a real change invalidates cached results; the web app calls
+        # this on every request, and unconditional bumps meant the result
+        # cache never survived long enough to hit.
+        _PREFS_VERSION += 1
+
+
+class SmartOutfitRecommender:
+    def __init__(self, wardrobe_path: str):
+        self.wardrobe_path = wardrobe_path
+        self._load_wardrobe()
+
+    def _load_wardrobe(self):
+        with open(self.wardrobe_path, "rb") as f:
+            raw = f.read()
+        self.wardrobe_db = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        self._mtime = os.path.getmtime(self.wardrobe_path)
+        for item in self.wardrobe_db:
+            # Interned strings make the equality checks inside the tag-set
+            # intersections and category comparisons pointer compares, since
+            # the style vocabulary is interned at module load too.
+            item["tags"] = [sys.intern(t) for t in item.get("tags", [])]
+            # Normalize category spellings ("one-piece" vs "one_piece") so
+            # lookups never need to try both.
+            item["category"] = sys.intern(item.get("category", "unknown").lower().replace("-", "_"))
+            item["age_group"] = sys.intern(item.get("age_group", "all"))
+            item["gender"] = sys.intern(item.get("gender", "unisex"))
+            item.setdefault("image", "")
+            # Image paths never change while the file is loaded; resolving
+            # and stat-ing them here keeps os.* out of the render loops.
+            img = item["image"]
+            item["_img_abs"] = os.path.abspath(img) if img else ""
+            item["_img_exists"] = bool(img) and os.path.exists(img)
+            # Frozen once so tag checks are C-level set intersections
+            # instead of Python loops over the tag list.
+            item["_tag_set"] = frozenset(item["tags"])
+            item["_color_tags"] = item["_tag_set"] & _COLOR_TERMS
+            item["_tag_bits"] = _tag_bits(item["tags"])
+        # Inverted indexes so category lookups are O(matches) instead of a
+        # full wardrobe scan per category per recommendation.
+        self._by_category = defaultdict(list)
+        self._by_cat_gender = defaultdict(list)
+        for item in self.wardrobe_db:
+            cat = item["category"]
+            self._by_category[cat].append(item)
+            if item["gender"] == "unisex":
+                for g in ("female", "male", "unisex"):
+                    self._by_cat_gender[(cat, g)].append(item)
+            else:
+                self._by_cat_gender[(cat, item["gender"])].append(item)
+        # Profile-filtered views of the whole wardrobe, cached per
+        # (age_group, gender) since only a handful of profiles exist.
+        self._profile_cache = {}
+        # Candidate lists per (category, gender, age_group), filled on first
+        # use; after that a request's category fetches are dict lookups with
+        # no per-item age scan.
+        self._cat_cache = {}
+        # Full recommendation results; repopulated from scratch whenever the
+        # wardrobe reloads or any user's preferences change.
+        self._result_cache = {}
+        self._cache_prefs_version = _PREFS_VERSION
+
+    def _maybe_reload(self):
+        # Re-parse the wardrobe only when the file actually changed on disk.
+        try:
+            mtime = os.path.getmtime(self.wardrobe_path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self._load_wardrobe()
+
+    def get_context(self):
+        now = datetime.datetime.now()
+        hour = now.hour
+        month = now.month
+        time_of_day = ("morning" if hour < 12 else "afternoon" if hour < 17 else "evening")
+        season = ("winter" if month in [12,1,2] else "summer" if month in [3,4,5] else "monsoon")
+        return {"time": time_of_day, "season": season}
+
+    def extract_prompt_requirements(self, prompt: str) -> Tuple[List[str], List[str], List[str], bool]:
+        prompt = prompt.lower()
+
+        # One pass collects request and avoid markers together with the word
+        # after each. The per-class end tracking reproduces the old separate
+        # regexes: a marker consumed inside another match of the SAME class
+        # is skipped, but the classes never hide each other's matches.
+        colors, avoid = [], []
+        req_end = avoid_end = 0
+        for m in _MARKER_RE.finditer(prompt):
+            if m.group("req") is not None:
+                if m.start() >= req_end:
+                    colors.append(m.group("word"))
+                    req_end = m.end("word")
+            elif m.start() >= avoid_end:
+                # Normalize forbidden colors to unify near-whites
+                avoid.append(_NEAR_WHITE_RE.sub("white", m.group("word")))
+                avoid_end = m.end("word")
+
+        # --- Single substring scan for occasion keys, synonyms and bare
+        # steering words (ethnic/outing/travel/layer vocab) ---
+        hits = set()
+        for m in _PHRASE_RE.finditer(prompt):
+            hits.update(_CONTAINED[m.group(1)])
+        # Common swim misspellings/synonyms; space-sensitive like the old
+        # replace chain, so "swimsuit" mid-sentence counts too.
+        if "swiming" in prompt or " swim" in prompt or "swim " in prompt:
+            hits.add("swimming")
+
+        expanded = {h for h in hits if h in OCCASION_STYLES}
+        # --- Synonym expansion for any matching phrase in prompt ---
+        for h in hits:
+            syn_key = _SYNONYM_TO_OCCASION.get(h)
+            if syn_key:
+                expanded.add(syn_key)
+
+        # --- Force ethnic/traditional if the prompt mentions those words
+        # anywhere (covers "office ethnic day" and friends) ---
+        if hits & _ETHNIC_WORDS:
+            expanded.update(("ethnic day", "ethnic", "traditional"))
+
+        # If still nothing, fallback to "casual" for outing-like prompts
+        if not expanded and hits & _OUTING_WORDS:
+            expanded.add("casual")
+        needs_layer = bool(hits & _LAYER_WORDS)
+
+        # --- Detect vacation or trip ---
+        self.vacation_destination = None  # default
+        if hits & _TRAVEL_WORDS:
+            for word in prompt.split():
+                if word in _COLD_PLACES:
+                    self.vacation_destination = word
+                    expanded.add("vacation")  # Just a placeholder tag
+                    needs_layer = True
+                    break
+                elif word in _HOT_PLACES:
+                    self.vacation_destination = word
+                    expanded.update(["vacation", "beach party", "party", "casual"])
+                    # no layer needed
+                    break
+
+        return list(set(colors)), list(expanded or ["general"]), list(set(avoid)), needs_layer
+
+    def _filter_by_profile(self, items: List[Dict], profile: Dict) -> List[Dict]:
+        key = (profile["age_group"], profile["gender"])
+        if items is self.wardrobe_db:
+            cached = self._profile_cache.get(key)
+            if cached is not None:
+                return cached
+        filtered = [
+            item for item in items
+            if item["age_group"] in ["all", profile["age_group"]] and item["gender"] in ["unisex", profile["gender"]]
+        ]
+        if items is self.wardrobe_db:
+            self._profile_cache[key] = filtered
+        return filtered
+
+    def _color_match(self, color_tags, requested_colors, forbidden_colors) -> bool:
+        # color_tags is the item's precomputed _color_tags set.
+        # Strictly reject if any tag is close to a forbidden color
+        if color_tags & _color_mask(forbidden_colors):
+            return False
+        # If requested colors, require at least one tag close to a requested color
+        if requested_colors:
+            return bool(color_tags & _color_mask(requested_colors))
+        # If no requested colors, allow if not forbidden
+        return True
+
+    def _filter_items(self, profile, occasions, colors, avoid_colors):
+        style_tags = set()
+        for occ in occasions:
+            style_tags.update(OCCASION_STYLES.get(occ, [occ]))  # fallback to occ as tag
+        style_bits = _tag_bits(style_tags)
+        items = self._filter_by_profile(self.wardrobe_db, profile)
+        filtered = [i for i in items if i["_tag_bits"] & style_bits]
+        # Try color+style filter, but if it yields nothing, fallback to style-only
+        if colors:
+            # Masks built once for the whole pass rather than per item.
+            req_mask = _color_mask(colors)
+            forbid_mask = _color_mask(avoid_colors)
+            color_filtered = [
+                i for i in filtered
+                if not i["_color_tags"] & forbid_mask and i["_color_tags"] & req_mask
+            ]
+            if color_filtered:
+                filtered = color_filtered
+        return filtered
+
+    _RESULT_CACHE_MAX = 4096
+
+    def recommend_outfits(self, prompt: str, username: str) -> Dict:
+        if username not in USER_DB:
+            raise ValueError("User not authenticated")
+        self._maybe_reload()
+        if self._cache_prefs_version != _PREFS_VERSION:
+            self._result_cache.clear()
+            self._cache_prefs_version = _PREFS_VERSION
+        profile = get_user_preferences(username)
+        context = self.get_context()
+        key = (username, prompt, profile.get("age_group", "adult"),
+               profile.get("gender", "unisex"), context["season"], context["time"])
+        result = self._result_cache.get(key)
+        if result is None:
+            # Deterministic per-request RNG: the same user and prompt always
+            # get the same picks, which makes results reproducible and
+            # cacheable.
+            rng = random.Random(hashlib.blake2b((username + prompt).encode(), digest_size=8).digest())
+            result = self._recommend_impl(prompt, username, profile, context, rng)
+            if len(self._result_cache) >= self._RESULT_CACHE_MAX:
+                self._result_cache.pop(next(iter(self._result_cache)))
+            self._result_cache[key] = result
+        return result
+
+    def _recommend_impl(self, prompt: str, username: str, profile: Dict, context: Dict, rng: random.Random) -> Dict:
+        colors, occasions, avoid, layer_needed = self.extract_prompt_requirements(prompt)
+        # Frozen once: these are invariant for the whole request and only
+        # ever probed for membership/emptiness from here on.
+        colors = frozenset(colors)
+        avoid = frozenset(avoid)
+        # Ensure layer_needed is set if "layer" or "cold" in prompt or winter season
+        layer_needed = layer_needed or ("layer" in prompt or "cold" in prompt or context["season"] == "winter")
+
+        # Neighbor masks for this request's colors, built once; every item
+        # check below is then one or two set intersections.
+        req_mask = _color_mask(colors)
+        forbid_mask = _color_mask(avoid)
+
+        # Per-request memo: an item's verdict against this request's
+        # colors/avoid never changes, so compute it at most once no matter
+        # how many branches re-check the same item.
+        _color_ok_memo = {}
+
+        def color_ok(item):
+            verdict = _color_ok_memo.get(id(item))
+            if verdict is None:
+                tags = item["_color_tags"]
+                verdict = not tags & forbid_mask and (not colors or bool(tags & req_mask))
+                _color_ok_memo[id(item)] = verdict
+            return verdict
+
+        def avoid_ok(item):
+            return not item["_color_tags"] & forbid_mask
+
+        def req_ok(item):
+            return not colors or bool(item["_color_tags"] & req_mask)
+
+        vacation = getattr(self, "vacation_destination", None)
+        # --- Vacation/trip handler: MOVE THIS BLOCK TO THE TOP ---
+        if vacation:
+            items = self._filter_by_profile(self.wardrobe_db, profile)
+            def get_style_pair(style_tag):
+                # Try strict color match for both top and bottom
+                tops = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"] and color_ok(i)]
+                bottoms = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"] and color_ok(i)]
+
+                # If both top and bottom color-matched, use them
+                if tops and bottoms:
+                    combo = [rng.choice(tops), rng.choice(bottoms)]
+                else:
+                    # If only one (top or bottom) color-matched, use color-matched for that and any for the other
+                    if tops:
+                        other_bottoms = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"] and avoid_ok(i)]
+                        if not other_bottoms:
+                            other_bottoms = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"]]
+                        if other_bottoms:
+                            combo = [rng.choice(tops), rng.choice(other_bottoms)]
+                        else:
+                            combo = None
+                    elif bottoms:
+                        other_tops = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"] and avoid_ok(i)]
+                        if not other_tops:
+                            other_tops = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"]]
+                        if other_tops:
+                            combo = [rng.choice(other_tops), rng.choice(bottoms)]
+                        else:
+                            combo = None
+                    else:
+                        # Fallback: style-only, avoid only avoided colors
+                        tops2 = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"] and avoid_ok(i)]
+                        bottoms2 = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"] and avoid_ok(i)]
+                        if tops2 and bottoms2:
+                            combo = [rng.choice(tops2), rng.choice(bottoms2)]
+                        else:
+                            # Final fallback: any top/bottom with style_tag, even if color not checked
+                            tops3 = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"]]
+                            bottoms3 = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"]]
+                            if tops3 and bottoms3:
+                                combo = [rng.choice(tops3), rng.choice(bottoms3)]
+                            else:
+                                # Always return a multi_piece with any 2 items if nothing found
+                                if len(items) >= 2:
+                                    return {"type": "multi_piece", "items": rng.sample(items, 2)}
+                                else:
+                                    return {"type": "none", "items": []}
+
+                if not combo:
+                    if len(items) >= 2:
+                        return {"type": "multi_piece", "items": rng.sample(items, 2)}
+                    else:
+                        return {"type": "none", "items": []}
+
+                if layer_needed:
+                    layers_avail = [l for l in items if l["category"] == "layer" and color_ok(l)]
+                    if not layers_avail:
+                        layers_avail = [l for l in items if l["category"] == "layer" and avoid_ok(l)]
+                    if not layers_avail:
+                        layers_avail = [l for l in items if l["category"] == "layer"]
+                    if layers_avail:
+                        combo.append(rng.choice(layers_avail))
+
+                return {"type": "multi_piece", "items": combo}
+
+            outfits = [
+                get_style_pair("traditional"),
+                get_style_pair("party"),
+                get_style_pair("formal")
+            ]
+            return {
+                "user": username,
+                "occasion": f"vacation to {vacation}",
+                "context": context,
+                "outfits": outfits
+            }
+
+        # --- Tag extraction and mapping ---
+        style_tags = set()
+        for occ in occasions:
+            style_tags.update(OCCASION_STYLES.get(occ, [occ]))  # fallback to occ as tag
+        style_tags.update(occasions)
+        style_bits = _tag_bits(style_tags)
+        occ_set = frozenset(occasions)
+
+        items = self._filter_by_profile(self.wardrobe_db, profile)
+
+        age_group = profile["age_group"]
+
+        def filter_category(cat, gender=None):
+            # Resolved views live on the instance, so across requests this
+            # is one dict lookup; the age scan runs once per combination.
+            key = (cat, gender or profile.get("gender", "unisex"), age_group)
+            cached = self._cat_cache.get(key)
+            if cached is None:
+                cat_items = self._by_cat_gender.get(key[:2], ())
+                cached = [i for i in cat_items if i["age_group"] in ("all", age_group)]
+                self._cat_cache[key] = cached
+            return cached
+
+        # Color-matched items for each category
+        def color_matched(items):
+            if colors:
+                color_items = [i for i in items if color_ok(i)]
+                return color_items if color_items else []
+            return []
+
+        gender = profile.get('gender', 'unisex')
+
+        # --- Swimming occasion: ONLY swimwear, color-matched if color specified ---
+        if "swimming" in occ_set or "swimming" in style_tags:
+            swimwear_items = filter_category("swimwear", gender=gender)
+            color_matched_swimwear = [i for i in swimwear_items if color_ok(i)] if colors else []
+            outfits = [{"type": "swimwear", "items": [sw]} for sw in color_matched_swimwear]
+            # Fill up to 3 with other swimwear not already included
+            if len(outfits) < 3:
+                used_names = {sw["name"] for sw in color_matched_swimwear}
+                for sw in swimwear_items:
+                    if sw["name"] not in used_names:
+                        outfits.append({"type": "swimwear", "items": [sw]})
+                        used_names.add(sw["name"])
+                    if len(outfits) == 3:
+                        break
+            while len(outfits) < 3:
+                outfits.append({"type": "none", "items": []})
+            logger.debug("Occasions %s", occasions)
+            logger.debug("Style Tags %s", style_tags)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Filtered Swimwear %s", [i["name"] for i in swimwear_items])
+            return {
+                "user": username,
+                "occasion": ", ".join(occasions),
+                "context": context,
+                "outfits": outfits
+            }
+
+        # For one-piece, only for females
+        one_pieces = filter_category("one_piece", gender="female") if gender == "female" else []
+
+        # Prioritize tops/bottoms that match style tags (ethnic/traditional etc.)
+        tops_all = filter_category("topwear", gender=gender)
+        bottoms_all = filter_category("bottomwear", gender=gender)
+
+        # One annotation walk per candidate list: every predicate a branch
+        # below may test (style/ethnic/party/active/formal tags, avoid and
+        # requested colors) is computed here once per item; the repeated
+        # narrowing passes become single flag checks.
+        ethnic_bits = _tag_bits(_ETHNIC_TAGS)
+        party_priority_bits = _tag_bits(_PARTY_PRIORITY_TAGS)
+        party_fallback_bits = _tag_bits(_FALLBACK_TAGS)
+        active_bits = style_bits | _tag_bits(_ACTIVE_OCCASIONS)
+        formal_bit = _tag_bits(("formal",))
+        flags = {}
+
+        def annotate(candidates):
+            for i in candidates:
+                bits = i["_tag_bits"]
+                f = 0
+                if bits & style_bits:
+                    f |= _F_STYLE
+                if bits & ethnic_bits:
+                    f |= _F_ETHNIC
+                if bits & party_priority_bits:
+                    f |= _F_PARTY
+                if bits & party_fallback_bits:
+                    f |= _F_FALLBACK
+                if bits & active_bits:
+                    f |= _F_ACTIVE
+                if bits & formal_bit:
+                    f |= _F_FORMAL
+                if avoid_ok(i):
+                    f |= _F_AVOID_OK
+                if color_ok(i):
+                    f |= _F_COLOR_OK
+                flags[id(i)] = f
+
+        annotate(tops_all)
+        annotate(bottoms_all)
+        annotate(one_pieces)
+
+        # --- Style filtering (same predicate for casual and other prompts) ---
+        tops = [t for t in tops_all if flags[id(t)] & _F_STYLE]
+        bottoms = [b for b in bottoms_all if flags[id(b)] & _F_STYLE]
+
+        # Only fallback to all if none found
+        if not tops:
+            tops = tops_all
+        if not bottoms:
+            bottoms = bottoms_all
+
+        # --- Filter out tops/bottoms with forbidden colors ---
+        if avoid:
+            tops = [t for t in tops if flags[id(t)] & _F_AVOID_OK]
+            bottoms = [b for b in bottoms if flags[id(b)] & _F_AVOID_OK]
+
+        # --- Ethnic/traditional strict filter for ethnic occasions ---
+        if _ETHNIC_TAGS & style_tags:
+            filtered_tops = [t for t in tops if flags[id(t)] & _F_ETHNIC]
+            filtered_bottoms = [b for b in bottoms if flags[id(b)] & _F_ETHNIC]
+            # Only use these if any exist, else fallback to previous
+            if filtered_tops:
+                tops = filtered_tops
+            if filtered_bottoms:
+                bottoms = filtered_bottoms
+
+        layers = filter_category("layer", gender=gender)
+
+        logger.debug("Occasions %s", occasions)
+        logger.debug("Style Tags %s", style_tags)
+        filtered = [i for i in items if i["_tag_bits"] & style_bits]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Filtered Items %s", [i["name"] for i in filtered])
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Tops %s", [i["name"] for i in tops])
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Bottoms %s", [i["name"] for i in bottoms])
+
+        # --- Early override for gym/activewear ---
+        if occ_set & _ACTIVE_OCCASIONS:
+            relevant_tops = [t for t in tops if flags[id(t)] & _F_ACTIVE]
+            relevant_bottoms = [b for b in bottoms if flags[id(b)] & _F_ACTIVE]
+
+            outfits = []
+
+            # Walk the cartesian product lazily; only the first three
+            # matching pairs are ever used, so materializing T*B tuples is
+            # pure waste. Prioritize color-matched pairs if color is
+            # specified, falling back to any pair when none match.
+            if colors:
+                # Color verdicts are per item, so hoist them out of the
+                # O(T*B) walk; the pair loop itself is just boolean ors.
+                bottom_ok = [color_ok(b) for b in relevant_bottoms]
+                source = (
+                    (t, b)
+                    for t, t_ok in ((t, color_ok(t)) for t in relevant_tops)
+                    for b, b_ok in zip(relevant_bottoms, bottom_ok)
+                    if t_ok or b_ok
+                )
+                pairs_to_use = list(islice(source, 3))
+                if not pairs_to_use:
+                    pairs_to_use = list(islice(product(relevant_tops, relevant_bottoms), 3))
+            else:
+                pairs_to_use = list(islice(product(relevant_tops, relevant_bottoms), 3))
+
+            # Fill up to 3 outfits, repeating pairs if needed
+            idx = 0
+            while len(outfits) < 3:
+                t, b = pairs_to_use[idx % len(pairs_to_use)]
+                outfits.append({"type": "multi_piece", "items": [t, b]})
+                idx += 1
+
+            return {
+                "user": username,
+                "occasion": ", ".join(occasions),
+                "context": context,
+                "outfits": outfits[:3]
+            }
+
+        # --- Strictly formal for office/business meeting/interview ---
+        # Only enforce strict formal wear if NO ethnic/traditional tag is present
+        if occ_set <= _FORMAL_OCC and not _ETHNIC_TAGS & style_tags:
+
+
+            tops = [t for t in tops if flags[id(t)] & _F_FORMAL]
+            bottoms = [b for b in bottoms if flags[id(b)] & _F_FORMAL]
+            logger.debug("Strictly formal filter applied.")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Formal Tops %s", [i["name"] for i in tops])
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Formal Bottoms %s", [i["name"] for i in bottoms])
+
+        # --- Strictly party for party occasion (including office party) ---
+        if occ_set & _PARTY_OCCASIONS:
+            party_tops = [t for t in tops if flags[id(t)] & _F_PARTY]
+            party_bottoms = [b for b in bottoms if flags[id(b)] & _F_PARTY]
+
+            # If no party-style items, include fallback formal ones
+            if not party_tops:
+                party_tops = [t for t in tops if flags[id(t)] & _F_FALLBACK]
+            if not party_bottoms:
+                party_bottoms = [b for b in bottoms if flags[id(b)] & _F_FALLBACK]
+
+            # --- NEW: If still empty and style_tags has ethnic/traditional, fallback to ethnic/traditional filtering ---
+            if (not party_tops or not party_bottoms) and (_ETHNIC_TAGS & style_tags):
+                party_tops = [t for t in tops_all if flags[id(t)] & _F_ETHNIC]
+                party_bottoms = [b for b in bottoms_all if flags[id(b)] & _F_ETHNIC]
+
+            # --- Only use color-matched tops/bottoms if color is specified ---
+            if colors:
+                party_tops_color = [t for t in party_tops if color_ok(t)]
+                party_bottoms_color = [b for b in party_bottoms if color_ok(b)]
+                if party_tops_color:
+                    party_tops = party_tops_color
+                if party_bottoms_color:
+                    party_bottoms = party_bottoms_color
+
+                # --- For female: prioritize one-piece if available and color-matched ---
+                if profile.get("gender") == "female":
+                    one_pieces_party = [op for op in one_pieces if flags[id(op)] & _F_PARTY]
+                    one_pieces_color = [op for op in one_pieces_party if color_ok(op)]
+                    if one_pieces_color:
+                        outfits = []
+                        # Add up to 3 unique one-piece outfits
+                        for op in one_pieces_color[:3]:
+                            outfits.append({"type": "one_piece", "items": [op]})
+                        # If less than 3, fill with top+bottom combos as before
+                        needed = 3 - len(outfits)
+                        if party_tops and party_bottoms and needed > 0:
+                            top = party_tops[0]
+                            unique_bottoms = party_bottoms
+                            for i in range(needed):
+                                bottom = unique_bottoms[i % len(unique_bottoms)]
+                                outfits.append({"type": "multi_piece", "items": [top, bottom]})
+                        return {
+                            "user": username,
+                            "occasion": ", ".join(occasions),
+                            "context": context,
+                            "outfits": outfits
+                        }
+
+                # Always provide 3 full outfits: repeat top with different bottoms if needed, but use different bottoms if possible
+                outfits = []
+                used_bottoms = set()
+                if party_tops and party_bottoms:
+                    top = party_tops[0]  # Use the color-matching or prioritized top
+                    for b in party_bottoms:
+                        if b["name"] not in used_bottoms:
+                            combo = [top, b]
+                            if layer_needed and layers:
+                                combo.append(rng.choice(layers))
+                            outfits.append({"type": "multi_piece", "items": combo})
+                            used_bottoms.add(b["name"])
+                            if len(outfits) == 3:
+                                break
+                    # If not enough outfits, repeat same top with unused bottoms
+                    while len(outfits) < 3:
+                        b = rng.choice(party_bottoms)
+                        combo = [top, b]
+                        if layer_needed and layers:
+                            combo.append(rng.choice(layers))
+                        outfits.append({"type": "multi_piece", "items": combo})
+                # --- NEW: If still no outfits, fallback to ethnic/traditional combos ---
+                if not outfits and (_ETHNIC_TAGS & style_tags):
+                    fallback_tops = [t for t in tops_all if flags[id(t)] & _F_ETHNIC]
+                    fallback_bottoms = [b for b in bottoms_all if flags[id(b)] & _F_ETHNIC]
+                    for t, b in zip(fallback_tops, fallback_bottoms):
+                        outfits.append({"type": "multi_piece", "items": [t, b]})
+                        if len(outfits) == 3:
+                            break
+                # --- Prevent crash if still empty ---
+                if not outfits:
+                    return {
+                        "user": username,
+                        "occasion": ", ".join(occasions),
+                        "context": context,
+                        "outfits": [{"type": "none", "items": []}] * 3
+                    }
+                return {
+                    "user": username,
+                    "occasion": ", ".join(occasions),
+                    "context": context,
+                    "outfits": outfits
+                }
+
+            tops = party_tops
+            bottoms = party_bottoms
+            logger.debug("Prioritized partywear for office party.")
+
+            logger.debug("Strictly party filter applied.")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Party Tops %s", [i["name"] for i in tops])
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Party Bottoms %s", [i["name"] for i in bottoms])
+
+        # --- Move color-matched variables here, after all filtering ---
+        one_pieces_color = color_matched(one_pieces)
+        tops_color = color_matched(tops)
+        bottoms_color = color_matched(bottoms)
+        layers_color = color_matched(layers)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Color-matched Tops %s", [t["name"] for t in tops_color])
+
+        outfits = []
+        used = set()
+
+        # --- For females: one-piece outfit if available ---
+        strictly_formal = occ_set <= _FORMAL_OCC
+        if (
+            gender == "female"
+            and one_pieces
+            and not strictly_formal
+            and not (_EXCLUDE_ONE_PIECE_TAGS & style_tags)
+            and not (_EXCLUDE_ONE_PIECE_CASUAL & style_tags)
+        ):
+            op_choices = one_pieces_color if one_pieces_color else one_pieces
+            # Only add one one-piece outfit (with layer if needed)
+            op = rng.choice([o for o in op_choices if o["name"] not in used])
+            outfit = [op]
+            used.add(op["name"])
+            if layer_needed and layers:
+                lyr_choices = layers_color if layers_color else layers
+                avail_layers = [l for l in lyr_choices if l["name"] not in used]
+                if avail_layers:
+                    lyr = rng.choice(avail_layers)
+                    outfit.append(lyr)
+                    used.add(lyr["name"])
+            outfits.append({"type": "one_piece", "items": outfit})
+
+        # --- Always include at least one top+bottom+layer outfit if layer is needed ---
+        if layer_needed and tops and bottoms and layers:
+            # Try to avoid duplicates; shuffle pair indices instead of
+            # materializing (t, b) tuples for the whole product.
+            n_bottoms = len(bottoms)
+            n_pairs = len(tops) * n_bottoms
+            added = 0
+            for k in rng.sample(range(n_pairs), n_pairs):
+                t = tops[k // n_bottoms]
+                b = bottoms[k % n_bottoms]
+                combo = [t, b]
+                lyr_choices = layers_color if layers_color else layers
+                combo_names = {i["name"] for i in combo}
+                avail_layers = [l for l in lyr_choices if l["name"] not in combo_names]
+                if avail_layers:
+                    lyr = rng.choice(avail_layers)
+                    combo.append(lyr)
+                if not any(set(i["name"] for i in combo) == set(j["name"] for j in o["items"]) for o in outfits):
+                    outfits.append({"type": "multi_piece", "items": combo})
+                    added += 1
+                if added >= 2:
+                    break
+
+        # --- Always include swimwear for swimming occasion ---
+        if "swimming" in occ_set or "swimming" in style_tags:
+            swimwear_items = filter_category("swimwear", gender=gender)
+            for sw in swimwear_items:
+                if sw["name"] not in used:
+                    outfits.append({"type": "swimwear", "items": [sw]})
+                    used.add(sw["name"])
+                    if len(outfits) >= 3:
+                        break
+        else:
+            # --- Handle standalone swimwear outfits (legacy logic) ---
+            swimwear_items = [i for i in filtered if i["category"] == "swimwear"]
+            if swimwear_items:
+                for sw in swimwear_items:
+                    if sw["name"] not in used:
+                        outfits.append({"type": "swimwear", "items": [sw]})
+                        used.add(sw["name"])
+                        if len(outfits) >= 3:
+                            break
+
+        # Adjust how many more outfits we need after adding swimwear
+        needed = 3 - len(outfits)
+
+        # --- Top+Bottom outfits ---
+        def make_top_bottom_outfits(top_list, bottom_list, layer_list, n, prefer_color=True):
+            combos = []
+            used_bottoms = set()
+            used_pairs = set()
+
+            # Requested-color verdicts depend only on the item, so compute
+            # them once per list; the pair loops below index these instead
+            # of re-testing every (top, bottom) combination.
+            top_req = [req_ok(t) for t in top_list]
+            bottom_req = [req_ok(b) for b in bottom_list]
+
+            # The layer pool and its style-matching subset are invariant
+            # across combos; only the tiny per-combo name exclusion remains
+            # inside the helper.
+            lyr_choices = layers_color if layers_color else layer_list
+            add_layer = bool(layer_needed and lyr_choices)
+            styled_layers = [l for l in lyr_choices if l["_tag_bits"] & style_bits] if add_layer else []
+
+            def maybe_add_layer(combo):
+                if not add_layer:
+                    return
+                combo_names = {i["name"] for i in combo}
+                filtered = [l for l in styled_layers if l["name"] not in combo_names]
+                if filtered:
+                    combo.append(rng.choice(filtered))
+                    return
+                avail_layers = [l for l in lyr_choices if l["name"] not in combo_names]
+                if avail_layers:
+                    combo.append(rng.choice(avail_layers))
+
+            # All of the double loops below share one shape: walk the
+            # cartesian product lazily, let a branch-specific ``accept``
+            # both test a (top, bottom) pair and record it in the used-
+            # sets, and stop as soon as the quota is filled. Because the
+            # generator is pulled one pair at a time, the used-set
+            # mutations interleave with the membership checks in exactly
+            # the order the old inline loops ran them.
+            def pairs(top_iter, bottom_iter, accept):
+                for t in top_iter:
+                    for b in bottom_iter:
+                        if accept(t, b):
+                            yield t, b
+
+            def take(gen, quota):
+                for t, b in islice(gen, quota):
+                    combo = [t, b]
+                    maybe_add_layer(combo)
+                    combos.append({"type": "multi_piece", "items": combo})
+
+            def accept_color(t, b):
+                # Cheap set probes first; the pair tuple is only built
+                # once those pass. Identity keys skip the per-pair string
+                # hashing.
+                bn = b["name"]
+                if bn in used_bottoms:
+                    return False
+                pair = (id(t), id(b))
+                if pair in used_pairs:
+                    return False
+                if not (req_ok(t) or req_ok(b)):
+                    return False
+                used_bottoms.add(bn)
+                used_pairs.add(pair)
+                return True
+
+            if prefer_color and (tops_color or bottoms_color):
+                take(pairs(tops_color, bottom_list, accept_color), n - len(combos))
+                if len(combos) >= n:
+                    return combos
+
+                def accept_color_rev(t, b):
+                    # Probed per pair: a bottom taken for an earlier pair
+                    # must not be served again with another top.
+                    bn = b["name"]
+                    if bn in used_bottoms:
+                        return False
+                    pair = (id(t), id(b))
+                    if pair in used_pairs:
+                        return False
+                    if not (req_ok(t) or req_ok(b)):
+                        return False
+                    used_bottoms.add(bn)
+                    used_pairs.add(pair)
+                    return True
+
+                for b in bottoms_color:
+                    take(pairs(top_list, [b], accept_color_rev), n - len(combos))
+                    if len(combos) >= n:
+                        return combos
+
+            if colors and len(tops_color) == 1:
+                top = tops_color[0]
+                top_id = id(top)
+                bottom_used = set()
+                for b in bottoms_color + bottom_list:
+                    bn = b["name"]
+                    if bn in bottom_used:
+                        continue
+                    pair = (top_id, id(b))
+                    if pair in used_pairs:
+                        continue
+                    combo = [top, b]
+                    used_pairs.add(pair)
+                    bottom_used.add(bn)
+                    maybe_add_layer(combo)
+                    combos.append({"type": "multi_piece", "items": combo})
+                    if len(combos) >= n - 1:
+                        break
+                for i, t in enumerate(top_list):
+                    if t["name"] == top["name"] or top_req[i]:
+                        continue
+                    t_id = id(t)
+                    for b in bottom_list:
+                        if (t_id, id(b)) in used_pairs:
+                            continue
+                        combo = [t, b]
+                        maybe_add_layer(combo)
+                        combos.append({"type": "multi_piece", "items": combo})
+                        return combos[:n]
+                return combos[:n]
+
+            def accept_fresh(t, b):
+                bn = b["name"]
+                if bn in used_bottoms:
+                    return False
+                pair = (id(t), id(b))
+                if pair in used_pairs:
+                    return False
+                used_bottoms.add(bn)
+                used_pairs.add(pair)
+                return True
+
+            if not colors:
+                used_tops = set()
+                used_bottoms = set()
+
+                def accept_no_color(t, b):
+                    # Probed per pair: once a top is taken its remaining
+                    # bottoms are skipped, so each outfit in this pass
+                    # gets a distinct top.
+                    if t["name"] in used_tops:
+                        return False
+                    if not accept_fresh(t, b):
+                        return False
+                    used_tops.add(t["name"])
+                    return True
+
+                take(pairs(top_list, bottom_list, accept_no_color),
+                     n - len(combos))
+                if len(combos) >= n:
+                    return combos
+                take(pairs(top_list, bottom_list,
+                           lambda t, b: (id(t), id(b)) not in used_pairs),
+                     n - len(combos))
+                return combos
+
+            # Only reached with colors set: the color predicates depend on
+            # one side each, so filter both sides before the cartesian walk
+            # instead of rejecting pair by pair.
+            cand_tops = [t for t, r in zip(top_list, top_req) if not r]
+            cand_bottoms = [b for b, r in zip(bottom_list, bottom_req)
+                            if not r and b["name"] not in used_bottoms]
+            take(pairs(cand_tops, cand_bottoms, accept_fresh), n - len(combos))
+            return combos
+
+
+        # How many more outfits needed?
+        needed = 3 - len(outfits)
+        # Try to fill with color-matched first, then fallback to occasion-matched
+        combos = make_top_bottom_outfits(tops, bottoms, layers, needed, prefer_color=True)
+        outfits.extend(combos)
+        needed = 3 - len(outfits)
+        if needed > 0:
+            combos = make_top_bottom_outfits(tops, bottoms, layers, needed, prefer_color=False)
+            outfits.extend(combos)
+
+        # --- Ensure no 'none' outfits are returned ---
+        if len(outfits) < 3:
+            # Attempt to reuse tops with different bottoms. Collect the
+            # (top, bottom) name pairs already served; the old initializer
+            # built a set of generator objects, which hash by identity, so
+            # the dedup below never rejected anything.
+            used_pairs = set()
+            for outfit in outfits:
+                names = [it["name"] for it in outfit["items"]
+                         if it["category"] in ("topwear", "bottomwear")]
+                if len(names) >= 2:
+                    used_pairs.add((names[0], names[1]))
+            extra_outfits = []
+            for t in tops:
+                for b in bottoms:
+                    pair = (t["name"], b["name"])
+                    if pair not in used_pairs:
+                        combo = [t, b]
+                        # Add layer if needed
+                        if layer_needed and layers:
+                            lyr = rng.choice(layers)
+                            combo.append(lyr)
+                        extra_outfits.append({"type": "multi_piece", "items": combo})
+                        used_pairs.add(pair)
+                        if len(outfits) + len(extra_outfits) >= 3:
+                            break
+                if len(outfits) + len(extra_outfits) >= 3:
+                    break
+            outfits.extend(extra_outfits[:3 - len(outfits)])
+
+        # Final fallback: if still not 3, sample distinct tops and bottoms
+        # in lockstep. One sample per list replaces three RNG draws per
+        # missing outfit and cannot serve the same pair twice.
+        need = 3 - len(outfits)
+        if need > 0 and tops and bottoms:
+            ts = rng.sample(tops, min(need, len(tops)))
+            bs = rng.sample(bottoms, min(need, len(bottoms)))
+            lyrs = rng.sample(layers, min(need, len(layers))) if layer_needed and layers else []
+            for k, (t, b) in enumerate(zip(ts, bs)):
+                combo = [t, b]
+                if k < len(lyrs):
+                    combo.append(lyrs[k])
+                outfits.append({"type": "multi_piece", "items": combo})
+
+        # Both non-vacation exits below return the same shell; build it
+        # once so the join over occasions runs a single time.
+        result = {
+            "user": username,
+            "occasion": ", ".join(occasions),
+            "context": context,
+        }
+
+        # --- Special handling for active/sport occasions ---
+        if occ_set & _ACTIVE_OCCASIONS:
+            used_top = set()
+            used_bottom = set()
+            # Only use tops/bottoms that match style tags for these occasions
+            relevant_tops = [t for t in tops if flags[id(t)] & _F_ACTIVE]
+            relevant_bottoms = [b for b in bottoms if flags[id(b)] & _F_ACTIVE]
+            # Prioritize color-matched items
+            tops_color = [t for t in relevant_tops if color_ok(t)]
+            bottoms_color = [b for b in relevant_bottoms if color_ok(b)]
+            tops_color_names = {i["name"] for i in tops_color}
+            bottoms_color_names = {i["name"] for i in bottoms_color}
+            top_priority = tops_color + [t for t in relevant_tops if t["name"] not in tops_color_names]
+            bottom_priority = bottoms_color + [b for b in relevant_bottoms if b["name"] not in bottoms_color_names]
+
+            # First: Add color-matched combo. Per-item verdicts hoisted out
+            # of the pair loop.
+            top_ok = [color_ok(t) for t in top_priority]
+            bottom_ok = [color_ok(b) for b in bottom_priority]
+            for t, t_ok in zip(top_priority, top_ok):
+                for b, b_ok in zip(bottom_priority, bottom_ok):
+                    if t_ok or b_ok:
+                        if t["name"] not in used_top and b["name"] not in used_bottom:
+                            outfits.append({"type": "multi_piece", "items": [t, b]})
+                            used_top.add(t["name"])
+                            used_bottom.add(b["name"])
+                            break
+                if len(outfits) >= 1:
+                    break
+
+            # Second: Add 2 more from style-matching (no color priority).
+            # islice caps the walk at the missing count, replacing the two
+            # per-iteration length checks; the used-set filter is evaluated
+            # lazily, so it sees the additions made for earlier pairs.
+            fresh = ((t, b) for t in relevant_tops for b in relevant_bottoms
+                     if t["name"] not in used_top and b["name"] not in used_bottom)
+            for t, b in islice(fresh, max(3 - len(outfits), 0)):
+                outfits.append({"type": "multi_piece", "items": [t, b]})
+                used_top.add(t["name"])
+                used_bottom.add(b["name"])
+
+            # Final fallback: fill if < 3
+            while len(outfits) < 3:
+                outfits.append({"type": "none", "items": []})
+
+            result["outfits"] = outfits[:3]
+            return result
+
+        # --- Vacation/trip handler ---
+        if vacation:
+            def get_style_pair(style_tag):
+                # Try strict color match for both top and bottom
+                tops = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"] and color_ok(i)]
+                bottoms = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"] and color_ok(i)]
+
+                # If both top and bottom color-matched, use them
+                if tops and bottoms:
+                    combo = [rng.choice(tops), rng.choice(bottoms)]
+                else:
+                    # If only one (top or bottom) color-matched, use color-matched for that and any for the other
+                    if tops:
+                        other_bottoms = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"] and avoid_ok(i)]
+                        if not other_bottoms:
+                            other_bottoms = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"]]
+                        if other_bottoms:
+                            combo = [rng.choice(tops), rng.choice(other_bottoms)]
+                        else:
+                            combo = None
+                    elif bottoms:
+                        other_tops = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"] and avoid_ok(i)]
+                        if not other_tops:
+                            other_tops = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"]]
+                        if other_tops:
+                            combo = [rng.choice(other_tops), rng.choice(bottoms)]
+                        else:
+                            combo = None
+                    else:
+                        # Fallback: style-only, avoid only avoided colors
+                        tops2 = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"] and avoid_ok(i)]
+                        bottoms2 = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"] and avoid_ok(i)]
+                        if tops2 and bottoms2:
+                            combo = [rng.choice(tops2), rng.choice(bottoms2)]
+                        else:
+                            # Final fallback: any top/bottom with style_tag, even if color not checked
+                            tops3 = [i for i in items if i["category"] == "topwear" and style_tag in i["tags"]]
+                            bottoms3 = [i for i in items if i["category"] == "bottomwear" and style_tag in i["tags"]]
+                            if tops3 and bottoms3:
+                                combo = [rng.choice(tops3), rng.choice(bottoms3)]
+                            else:
+                                return {"type": "none", "items": []}
+
+                if not combo:
+                    return {"type": "none", "items": []}
+
+                if layer_needed:
+                    layers_avail = [l for l in items if l["category"] == "layer" and color_ok(l)]
+                    if not layers_avail:
+                        layers_avail = [l for l in items if l["category"] == "layer" and avoid_ok(l)]
+                    if not layers_avail:
+                        layers_avail = [l for l in items if l["category"] == "layer"]
+                    if layers_avail:
+                        combo.append(rng.choice(layers_avail))
+
+                return {"type": "multi_piece", "items": combo}
+
+            outfits = [
+                get_style_pair("traditional"),
+                get_style_pair("party"),
+                get_style_pair("formal")
+            ]
+            return {
+                "user": username,
+                "occasion": f"vacation to {vacation}",
+                "context": context,
+                "outfits": outfits
+            }
+
+        result["outfits"] = outfits[:3]
+        return result
+def show_outfits_html(result):
+    # The CSS never varies, so it stays out of the .format() template:
+    # format() no longer scans the whole block and the braces no longer
+    # need doubling.
+    html = """
+    <html>
+    <head>
+        <title>Recommended Outfits</title>
+        <style>
+            body { font-family: Arial, sans-serif; }
+            .outfit { margin-bottom: 30px; }
+            .item { margin-left: 20px; }
+            img { max-width: 200px; max-height: 200px; display: block; margin-top: 5px; }
+        </style>
+    </head>
+    <body>
+    """
+    # Accumulate fragments and join once; repeated `html +=` recopies the
+    # whole document for every appended piece.
+    parts = [html, """    <h2>Recommended Outfits for {user}</h2>
+        <p><b>Occasion:</b> {occasion}</p>
+        <p><b>Context:</b> {context}</p>
+    """.format(
+        user=result['user'],
+        occasion=result['occasion'],
+        context=", ".join(f"{k}: {v}" for k, v in result['context'].items())
+    )]
+    for idx, outfit in enumerate(result['outfits'], 1):
+        parts.append(f'<div class="outfit"><h3>Outfit {idx} ({outfit["type"]})</h3>')
+        for item in outfit['items']:
+            parts.append(f'<div class="item"><b>{item["name"]} ({item["category"]})</b><br>')
+            img_path = item.get("image", "")
+            if item.get("_img_exists"):
+                parts.append(f'<img src="file:///{item["_img_abs"]}">')
+            elif img_path:
+                parts.append(f'<img src="{img_path}">')
+            else:
+                parts.append('<i>No image available</i>')
+            parts.append('</div>')
+        parts.append('</div>')
+    parts.append("</body></html>")
+    html = "".join(parts)
+
+    # The write and the browser launch don't need to finish before the
+    # caller moves on; webbrowser.open can block while the browser spawns.
+    threading.Thread(target=_write_and_open, args=(html,), daemon=True).start()
+
+def _write_and_open(html):
+    with tempfile.NamedTemporaryFile('w', delete=False, suffix='.html', encoding='utf-8') as f:
+        f.write(html)
+        temp_html_path = f.name
+    webbrowser.open('file://' + os.path.abspath(temp_html_path))
+
+def show_all_outfits(wardrobe_path):
+    with open(wardrobe_path, "r", encoding="utf-8") as f:
+        wardrobe = json.load(f)
+    # Same per-item precompute the recommender does at load: one abspath
+    # and one stat per item, none in the render loop.
+    for it in wardrobe:
+        p = it.get("image", "")
+        it["_img_abs"] = os.path.abspath(p) if p else ""
+        it["_img_exists"] = bool(p) and os.path.exists(p)
+    # Plain literal, never formatted; the doubled braces used to leak into
+    # the served CSS as-is.
+    html = """
+    <html>
+    <head>
+        <title>All Outfits</title>
+        <style>
+            body { font-family: Arial, sans-serif; }
+            .item { margin-bottom: 20px; }
+            img { max-width: 200px; max-height: 200px; display: block; margin-top: 5px; }
+        </style>
+    </head>
+    <body>
+        <h2>All Outfits in Wardrobe</h2>
+    """
+    parts = [html]
+    for item in wardrobe:
+        parts.append(f'<div class="item"><b>{item["name"]} ({item["category"]})</b><br>')
+        img_path = item.get("image", "")
+        if item["_img_exists"]:
+            parts.append(f'<img src="file:///{item["_img_abs"]}">')
+        elif img_path:
+            parts.append(f'<img src="{img_path}">')
+        else:
+            parts.append('<i>No image available</i>')
+        parts.append('</div>')
+    parts.append("</body></html>")
+    html = "".join(parts)
+
+    with tempfile.NamedTemporaryFile('w', delete=False, suffix='.html', encoding='utf-8') as f:
+        f.write(html)
+        temp_html_path = f.name
+    webbrowser.open('file://' + os.path.abspath(temp_html_path))
+
+# --- Interactive Terminal Entry ---
+if __name__ == "__main__":
+    print("Welcome to the Smart Outfit Recommender")
+    print("1. Show all outfits in wardrobe")
+    print("2. Get outfit recommendations")
+    choice = input("Enter your choice (1/2): ").strip()
+    if choice == "1":
+        show_all_outfits("wardrobe.json")
+        exit()
+    username = input("Enter your name: ").strip().lower()
+    password = input("Set or enter your password: ").strip()
+
+    if username not in USER_DB:
+        age_group = input("Enter your age group (toddler/teen/adult/senior): ").strip().lower()
+        gender = input("Enter your gender (male/female/unisex): ").strip().lower()
+        register_user(username, password, {"age_group": age_group, "gender": gender})
+    else:
+        if not authenticate_user(username, password):
+            print("Invalid password. Exiting.")
+            exit()
+
+    recommender = SmartOutfitRecommender("wardrobe.json")
+    while True:
+        print("\nAvailable occasions include:")
+        print(", ".join(sorted(OCCASION_STYLES.keys())))
+        print("Please select an occasion from the above list.")
+        occasion_input = input("Occasion (or type 'exit' to quit): ").strip()
+        if occasion_input.lower() == "exit":
+            print("Goodbye!")
+            break
+        # Optionally, allow user to add more details (color, avoid, etc.)
+        extra_prompt = input("Any specific preferences? (e.g. color, avoid, layering) If none, press Enter: ").strip()
+        if extra_prompt:
+            prompt = f"{occasion_input} {extra_prompt}"
+        else:
+            prompt = occasion_input
+        result = recommender.recommend_outfits(prompt, username)
+        print("\nRecommended Outfits:")
+        for idx, outfit in enumerate(result['outfits'], 1):
+            print(f"\nOutfit {idx} ({outfit['type']}):")
+            for item in outfit['items']:
+                print(f"  - {item['name']} ({item['category']})")
+                print(f"    Image: {item.get('image', 'No image available')}")
+        # Show HTML popup with images
+        show_outfits_html(result)
+
@@ -0,0 +1,12 @@
+# Production entry point. Run with:
+#   gunicorn -k gevent -w 2 --worker-connections 500 wsgi:app
+# The dev server (python app.py) stays single-threaded and blocks on every
+# recommendation; gevent workers let one process serve many concurrent
+# requests on the I/O-bound paths.
+from gevent import monkey
+
+# Must happen before app/industry6 are imported so their socket/file I/O
+# is cooperative.
+monkey.patch_all()
+
+from app import app  # noqa: E402